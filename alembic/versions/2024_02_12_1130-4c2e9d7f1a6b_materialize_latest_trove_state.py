@@ -0,0 +1,72 @@
+"""Materialize latest trove state
+
+Revision ID: 4c2e9d7f1a6b
+Revises: 980c387d42ec
+Create Date: 2024-02-12 11:30:12.418825
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c2e9d7f1a6b'
+down_revision: Union[str, None] = '980c387d42ec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('trove_states',
+    sa.Column('trove_id', sa.BigInteger(), nullable=False),
+    sa.Column('manager_id', sa.BigInteger(), nullable=True),
+    sa.Column('owner_id', sa.String(), nullable=True),
+    sa.Column('status', postgresql.ENUM('open', 'closed_by_owner', 'closed_by_liquidation', 'closed_by_redemption', name='trovestatus', create_type=False), nullable=True),
+    sa.Column('collateral', sa.Numeric(), nullable=True),
+    sa.Column('debt', sa.Numeric(), nullable=True),
+    sa.Column('stake', sa.Numeric(), nullable=True),
+    sa.Column('first_timestamp', sa.Numeric(), nullable=True),
+    sa.Column('last_timestamp', sa.Numeric(), nullable=True),
+    sa.Column('last_index', sa.Integer(), nullable=True),
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('clock_timestamp()'), nullable=False),
+    sa.ForeignKeyConstraint(['manager_id'], ['trove_managers.id'], name=op.f('fk__trove_states__manager_id__trove_managers')),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], name=op.f('fk__trove_states__owner_id__users')),
+    sa.ForeignKeyConstraint(['trove_id'], ['troves.id'], name=op.f('fk__trove_states__trove_id__troves')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk__trove_states'))
+    )
+    op.create_index('idx_trove_states__trove_id', 'trove_states', ['trove_id'], unique=True)
+    op.create_index('idx_trove_states__manager_id__status', 'trove_states', ['manager_id', 'status'], unique=False)
+
+    # back-fill from the existing snapshot history
+    op.execute("""
+    INSERT INTO trove_states (
+        trove_id, manager_id, owner_id, status, collateral, debt, stake,
+        first_timestamp, last_timestamp, last_index
+    )
+    SELECT
+        t.id, t.manager_id, t.owner_id, t.status,
+        latest.collateral, latest.debt, latest.stake,
+        bounds.first_timestamp, latest.block_timestamp, latest.index
+    FROM troves t
+    JOIN (
+        SELECT trove_id, MIN(block_timestamp) AS first_timestamp
+        FROM trove_snapshots
+        GROUP BY trove_id
+    ) bounds ON bounds.trove_id = t.id
+    JOIN (
+        SELECT DISTINCT ON (trove_id)
+            trove_id, collateral, debt, stake, block_timestamp, index
+        FROM trove_snapshots
+        ORDER BY trove_id, block_timestamp DESC, index DESC
+    ) latest ON latest.trove_id = t.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_trove_states__manager_id__status', table_name='trove_states')
+    op.drop_index('idx_trove_states__trove_id', table_name='trove_states')
+    op.drop_table('trove_states')
@@ -0,0 +1,29 @@
+"""Index trove states for search
+
+Revision ID: 7b3f0e5c8d21
+Revises: 4c2e9d7f1a6b
+Create Date: 2024-02-13 09:15:47.205613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3f0e5c8d21'
+down_revision: Union[str, None] = '4c2e9d7f1a6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('idx_trove_states__manager_id__last_timestamp__trove_id', 'trove_states', ['manager_id', 'last_timestamp', 'trove_id'], unique=False)
+    op.create_index('idx_trove_states__owner_id_trgm', 'trove_states', ['owner_id'], unique=False, postgresql_using='gin', postgresql_ops={'owner_id': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('idx_trove_states__owner_id_trgm', table_name='trove_states', postgresql_using='gin', postgresql_ops={'owner_id': 'gin_trgm_ops'})
+    op.drop_index('idx_trove_states__manager_id__last_timestamp__trove_id', table_name='trove_states')
@@ -0,0 +1,84 @@
+"""Roll up trove manager snapshots per day
+
+Revision ID: 2d8a6f41c9e3
+Revises: 7b3f0e5c8d21
+Create Date: 2024-02-15 10:20:31.552907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8a6f41c9e3'
+down_revision: Union[str, None] = '7b3f0e5c8d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BUCKET_SIZE = 24 * 60 * 60
+
+
+def upgrade() -> None:
+    op.create_table('trove_manager_daily_rollups',
+    sa.Column('manager_id', sa.BigInteger(), nullable=False),
+    sa.Column('bucket', sa.Numeric(), nullable=False),
+    sa.Column('snapshots', sa.Integer(), nullable=True),
+    sa.Column('last_timestamp', sa.Numeric(), nullable=True),
+    sa.Column('last_index', sa.Integer(), nullable=True),
+    sa.Column('last_collateral_price', sa.Numeric(), nullable=True),
+    sa.Column('last_collateral_ratio', sa.Numeric(), nullable=True),
+    sa.Column('max_collateral_ratio', sa.Numeric(), nullable=True),
+    sa.Column('last_total_collateral_usd', sa.Numeric(), nullable=True),
+    sa.Column('max_total_collateral_usd', sa.Numeric(), nullable=True),
+    sa.Column('avg_total_collateral_usd', sa.Numeric(), nullable=True),
+    sa.Column('last_total_debt', sa.Numeric(), nullable=True),
+    sa.Column('max_total_debt', sa.Numeric(), nullable=True),
+    sa.Column('avg_total_debt', sa.Numeric(), nullable=True),
+    sa.Column('last_open_troves', sa.Integer(), nullable=True),
+    sa.Column('max_open_troves', sa.Integer(), nullable=True),
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('clock_timestamp()'), nullable=False),
+    sa.ForeignKeyConstraint(['manager_id'], ['trove_managers.id'], name=op.f('fk__trove_manager_daily_rollups__manager_id__trove_managers')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk__trove_manager_daily_rollups'))
+    )
+    op.create_index('idx_trove_manager_daily_rollups__manager_id__bucket', 'trove_manager_daily_rollups', ['manager_id', 'bucket'], unique=True)
+
+    # back-fill from the existing snapshot history
+    op.execute(f"""
+        INSERT INTO trove_manager_daily_rollups (
+            manager_id, bucket, snapshots, last_timestamp, last_index,
+            last_collateral_price, last_collateral_ratio, max_collateral_ratio,
+            last_total_collateral_usd, max_total_collateral_usd,
+            avg_total_collateral_usd, last_total_debt, max_total_debt,
+            avg_total_debt, last_open_troves, max_open_troves
+        )
+        SELECT
+            manager_id,
+            FLOOR(block_timestamp / {BUCKET_SIZE}) * {BUCKET_SIZE} AS bucket,
+            COUNT(*),
+            MAX(block_timestamp),
+            (ARRAY_AGG(index ORDER BY block_timestamp DESC, index DESC))[1],
+            (ARRAY_AGG(collateral_price ORDER BY block_timestamp DESC, index DESC))[1],
+            (ARRAY_AGG(collateral_ratio ORDER BY block_timestamp DESC, index DESC))[1],
+            MAX(collateral_ratio) FILTER (
+                WHERE total_collateral_usd IS NOT NULL AND total_debt IS NOT NULL
+            ),
+            (ARRAY_AGG(total_collateral_usd ORDER BY block_timestamp DESC, index DESC))[1],
+            MAX(total_collateral_usd),
+            AVG(total_collateral_usd),
+            (ARRAY_AGG(total_debt ORDER BY block_timestamp DESC, index DESC))[1],
+            MAX(total_debt),
+            AVG(total_debt),
+            (ARRAY_AGG(open_troves ORDER BY block_timestamp DESC, index DESC))[1],
+            MAX(open_troves)
+        FROM trove_manager_snapshots
+        WHERE manager_id IS NOT NULL
+        GROUP BY manager_id, bucket
+        """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_trove_manager_daily_rollups__manager_id__bucket', table_name='trove_manager_daily_rollups')
+    op.drop_table('trove_manager_daily_rollups')
@@ -10,6 +10,8 @@ from database.pool import pg_notify_pool
 from services.messaging.pubsub import listen_for_redis_notifications
 from services.messaging.redis import close_redis
 from settings.config import settings
+from utils.cache import close_cache
+from utils.http import close_http_session, get_http_session
 
 init_logger(is_debug=settings.DEBUG)
 
@@ -39,11 +41,14 @@ app.add_middleware(
 async def startup_db():
     await db.connect()
     await pg_notify_pool.create_pool()
+    await get_http_session()
     asyncio.create_task(listen_for_redis_notifications())
 
 
 @app.on_event("shutdown")
 async def shutdown_db():
     await close_redis("fastapi")
+    await close_cache()
+    await close_http_session()
     await db.disconnect()
     await asyncio.wait_for(pg_notify_pool.close_pool(), timeout=10.0)
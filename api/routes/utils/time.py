@@ -19,3 +19,13 @@ def apply_period(period: Period) -> int:
     else:
         start_timestamp = 0
     return int(start_timestamp)
+
+
+def apply_period_by_day(period: Period) -> int:
+    """
+    Start of the day the period starts in. Queries on daily rollups start
+    there, so the first day of a period is reported in full like every
+    other day rather than from part way through its bucket.
+    """
+    start_timestamp = apply_period(period)
+    return start_timestamp - start_timestamp % SECONDS_IN_DAY
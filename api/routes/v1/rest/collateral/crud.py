@@ -2,8 +2,6 @@ import logging
 from datetime import datetime
 from operator import and_
 
-import aiohttp
-from aiocache import Cache, cached
 from sqlalchemy import func, select
 
 from api.models.common import DecimalTimeSeries, Pagination, Period
@@ -15,12 +13,14 @@ from api.routes.v1.rest.collateral.models import (
 )
 from database.engine import db
 from database.models.troves import Collateral, PriceRecord, ZapStakes
+from utils.cache import shared_cached
 from utils.const import CBETH, RETH, SFRXETH, WSTETH
+from utils.http import get_http_session
 
 logger = logging.getLogger()
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="collateral")
 async def get_market_prices(
     chain: str, collateral: str, period: Period
 ) -> list[DecimalTimeSeries]:
@@ -29,10 +29,10 @@ async def get_market_prices(
     start_timestamp = apply_period(period)
     span = int((current_timestamp - start_timestamp) // (4 * 3600))
     url = f"https://coins.llama.fi/chart/{chain}:{collat}?start={start_timestamp}&span={span}&period=4h"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            response.raise_for_status()
-            data = await response.json()
+    session = await get_http_session()
+    async with session.get(url) as response:
+        response.raise_for_status()
+        data = await response.json()
     prices_data = data["coins"].get(f"{chain}:{collat}", {}).get("prices", [])
     return [
         DecimalTimeSeries(value=entry["price"], timestamp=entry["timestamp"])
@@ -40,7 +40,7 @@ async def get_market_prices(
     ]
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="collateral")
 async def get_oracle_prices(
     collateral_id: int, period: Period
 ) -> list[DecimalTimeSeries]:
@@ -65,20 +65,20 @@ async def get_oracle_prices(
     ]
 
 
-@cached(ttl=3600, cache=Cache.MEMORY)
+@shared_cached(ttl=3600, namespace="collateral")
 async def get_gecko_supply(chain: str, token: str) -> float:
     url = f"https://api.coingecko.com/api/v3/coins/{chain}/contract/{token}"
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                data = await response.json()
-                return float(data["market_data"]["total_supply"])
+        session = await get_http_session()
+        async with session.get(url) as response:
+            data = await response.json()
+            return float(data["market_data"]["total_supply"])
     except Exception as e:
         logger.error(f"Error fetching supply from coingecko: {e}")
         return 0
 
 
-@cached(ttl=3600, cache=Cache.MEMORY)
+@shared_cached(ttl=3600, namespace="collateral")
 async def get_lsd_share(token: str) -> float:
     token_to_dl_slug = {
         CBETH.lower(): "Coinbase Wrapped Staked ETH",
@@ -88,9 +88,9 @@ async def get_lsd_share(token: str) -> float:
     }
     url = f"https://defillama-datasets.llama.fi/lite/protocols2?b=2"
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                data = await response.json()
+        session = await get_http_session()
+        async with session.get(url) as response:
+            data = await response.json()
         protocol_data = {
             p["name"]: p["tvl"]
             for p in data["protocols"]
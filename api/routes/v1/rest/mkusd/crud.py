@@ -1,9 +1,8 @@
 import logging
 from datetime import datetime
 
-import aiohttp
+import numpy as np
 import pandas as pd
-from aiocache import Cache, cached
 from sqlalchemy import Integer, and_, bindparam, select, text
 from web3 import Web3
 
@@ -12,101 +11,66 @@ from api.routes.utils.time import SECONDS_IN_DAY, apply_period
 from database.engine import db
 from database.models.common import StableCoinPrice
 from services.prices.liquidity_depth import PoolDepth, PoolSales
+from utils.cache import shared_cached
 from utils.const import PROVIDERS, STABLECOINS
 from utils.const.abis import MKUSD_ABI
+from utils.http import get_http_session
 
 logger = logging.getLogger()
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+def sum_daily_debts(
+    buckets: list[int], manager_ids: list[int], debts: list[float]
+) -> pd.Series:
+    """
+    Total debt per day across managers, indexed by day timestamp. Each
+    manager's last known debt is carried forward over the days it has no
+    snapshot, managers count as zero before their first one.
+    """
+    df = pd.DataFrame(
+        {"bucket": buckets, "manager_id": manager_ids, "total_debt": debts}
+    )
+    daily = df.pivot(index="bucket", columns="manager_id", values="total_debt")
+    days = np.arange(
+        daily.index.min(), daily.index.max() + SECONDS_IN_DAY, SECONDS_IN_DAY
+    )
+    return daily.reindex(days).ffill().sum(axis=1)
+
+
+@shared_cached(ttl=300, namespace="mkusd")
 async def get_supply_history(chain_id: int) -> list[DecimalTimeSeries]:
     query = """
-    WITH relevant_managers AS (
-        SELECT
-            id
-        FROM
-            trove_managers
-        WHERE
-            chain_id = :chain_id
-    ),
-    daily_debts AS (
-        SELECT
-            tms.manager_id,
-            tms.total_debt,
-            tms.block_timestamp,
-            DATE(TO_TIMESTAMP(tms.block_timestamp)) AS snapshot_date,
-            ROW_NUMBER() OVER(PARTITION BY tms.manager_id, DATE(TO_TIMESTAMP(tms.block_timestamp)) ORDER BY tms.block_timestamp DESC) AS rn
-        FROM
-            trove_manager_snapshots tms
-        INNER JOIN
-            relevant_managers rm ON tms.manager_id = rm.id
-    )
     SELECT
-        manager_id,
-        snapshot_date,
-        total_debt
+        r.manager_id,
+        r.bucket,
+        r.last_total_debt AS total_debt
     FROM
-        daily_debts
+        trove_manager_daily_rollups r
+    INNER JOIN
+        trove_managers tm ON r.manager_id = tm.id
     WHERE
-        rn = 1
-    ORDER BY
-        manager_id, snapshot_date
+        tm.chain_id = :chain_id
 
     """
     results = await db.fetch_all(query, values={"chain_id": chain_id})
+    if not results:
+        return []
 
-    df = pd.DataFrame(
+    supply = sum_daily_debts(
+        [int(r["bucket"]) for r in results],
+        [r["manager_id"] for r in results],
         [
-            {
-                "snapshot_date": r["snapshot_date"],
-                "manager_id": r["manager_id"],
-                "total_debt": r["total_debt"],
-            }
+            float(r["total_debt"]) if r["total_debt"] is not None else np.nan
             for r in results
-        ]
+        ],
     )
-    df["snapshot_date"] = pd.to_datetime(df["snapshot_date"])
-    df.sort_values("snapshot_date", inplace=True)
-
-    print(df)
-    min_date = df["snapshot_date"].min()
-    max_date = df["snapshot_date"].max()
-    all_dates = pd.date_range(start=min_date, end=max_date, freq="D")
-    filled_df = pd.DataFrame()
-
-    for manager_id in df["manager_id"].unique():
-        manager_df = df[df["manager_id"] == manager_id].copy()
-        manager_df.sort_values("snapshot_date", inplace=True)
-        manager_df.set_index("snapshot_date", inplace=True)
-        manager_df.index = pd.to_datetime(manager_df.index)
-        manager_df = manager_df.reindex(all_dates)
-        manager_df.ffill(inplace=True)
-        manager_df = manager_df.reset_index().rename(
-            columns={"index": "snapshot_date"}
-        )
-        manager_df["manager_id"] = manager_id
-
-        filled_df = pd.concat([filled_df, manager_df], ignore_index=True)
-
-    print(filled_df.sort_values("snapshot_date"))
-
-    summed_df = (
-        filled_df.groupby("snapshot_date")["total_debt"].sum().reset_index()
-    )
-    summed_df.sort_values("snapshot_date", inplace=True)
-
-    series = [
-        DecimalTimeSeries(
-            value=row["total_debt"],
-            timestamp=int(row["snapshot_date"].timestamp()),
-        )
-        for index, row in summed_df.iterrows()
+    return [
+        DecimalTimeSeries(value=value, timestamp=timestamp)
+        for timestamp, value in zip(supply.index.tolist(), supply.tolist())
     ]
 
-    return series
-
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="mkusd")
 async def get_price_history(
     chain_id: int, period: Period
 ) -> list[DecimalTimeSeries]:
@@ -129,11 +93,10 @@ async def get_price_history(
     ]
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="mkusd")
 async def get_price_histogram(
     chain_id: int, bins: int, period: Period
 ) -> list[IntegerLabelledSeries]:
-
     start_timestamp = apply_period(period)
 
     query = text(
@@ -188,6 +151,10 @@ async def get_price_histogram(
 
 
 def _find_threshold(asks: PoolSales):
+    for threshold in asks.thresholds:
+        if threshold.impact == 0.02:
+            return threshold.amount
+    # depth data stored before thresholds were solved for
     for i, price in enumerate(asks.prices):
         pct = (price - asks.prices[0]) / price
         if pct < -0.02:
@@ -195,7 +162,7 @@ def _find_threshold(asks: PoolSales):
     return 0
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="mkusd")
 async def get_two_percent(data: list[PoolDepth]) -> float:
     total = 0
     for i, pool in enumerate(data):
@@ -210,7 +177,7 @@ async def get_two_percent(data: list[PoolDepth]) -> float:
     return total
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="mkusd")
 async def get_circulating_supply(chain: str) -> float:
     try:
         w3 = PROVIDERS[chain]
@@ -223,21 +190,21 @@ async def get_circulating_supply(chain: str) -> float:
         return 0
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="mkusd")
 async def get_price(chain: str) -> float:
     url = f"https://prices.curve.fi/v1/usd_price/{chain}/{STABLECOINS[chain]}"
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                data = await response.json()
+        session = await get_http_session()
+        async with session.get(url) as response:
+            response.raise_for_status()
+            data = await response.json()
         return data["data"]["usd_price"]
     except Exception as e:
         logging.error(f"Error fetching price from {url}: {e}")
         return 0
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="mkusd")
 async def get_volume(chain: str, pools: list[str]) -> float:
     total = 0
     current_timestamp = int(datetime.utcnow().timestamp())
@@ -245,10 +212,10 @@ async def get_volume(chain: str, pools: list[str]) -> float:
     for pool in pools:
         try:
             url = f"https://prices.curve.fi/v1/volume/usd/{chain}/{pool}?interval=day&start={start_timestamp}&end={current_timestamp}"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    response.raise_for_status()
-                    data = await response.json()
+            session = await get_http_session()
+            async with session.get(url) as response:
+                response.raise_for_status()
+                data = await response.json()
             total += data["data"][0]["volume"]
         except Exception as e:
             logging.error(
@@ -1,4 +1,3 @@
-from aiocache import Cache, cached
 from sqlalchemy import and_, func, select
 
 from api.routes.utils.time import apply_period
@@ -10,9 +9,10 @@ from api.routes.v1.rest.revenue.models import (
 )
 from database.engine import db
 from database.models.common import RevenueSnapshot
+from utils.cache import shared_cached
 
 
-@cached(ttl=60, cache=Cache.MEMORY)
+@shared_cached(ttl=60, namespace="revenue")
 async def get_snapshots(
     filter_set: PeriodFilterSet, chain_id: int
 ) -> RevenueSnapshotsResponse:
@@ -43,7 +43,7 @@ async def get_snapshots(
     return RevenueSnapshotsResponse(snapshots=snapshots)
 
 
-@cached(ttl=60, cache=Cache.MEMORY)
+@shared_cached(ttl=60, namespace="revenue")
 async def get_rev_breakdown(chain_id: int) -> RevenueBreakdownResponse:
     query = select(
         [
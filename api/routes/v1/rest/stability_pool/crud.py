@@ -1,5 +1,4 @@
 import pandas as pd
-from aiocache import Cache, cached
 from sqlalchemy import and_, case, desc, func, or_, select
 from web3 import Web3
 
@@ -18,9 +17,10 @@ from database.models.troves import (
     StabilityPoolOperation,
     StabilityPoolSnapshot,
 )
+from utils.cache import shared_cached
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="stability_pool")
 async def get_pool_amounts(
     chain_id: int, period: Period, withdraw: bool
 ) -> list[DecimalTimeSeries]:
@@ -52,7 +52,7 @@ async def get_pool_amounts(
     ]
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="stability_pool")
 async def get_main_stable_deposits_withdrawals(
     chain_id: int, top: int, period: Period, withdrawal: bool
 ) -> list[PoolStableOperation]:
@@ -100,7 +100,7 @@ async def get_main_stable_deposits_withdrawals(
     ]
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="stability_pool")
 async def get_stable_deposits_and_withdrawals(
     chain_id: int, period: Period
 ) -> PoolDepositsWithdrawalsHistorical:
@@ -187,7 +187,7 @@ async def get_stable_deposits_and_withdrawals(
     )
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="stability_pool")
 async def get_deposit_histogram(chain_id: int) -> DistributionResponse:
     subquery = (
         select(
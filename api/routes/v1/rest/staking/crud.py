@@ -2,7 +2,6 @@ import json
 
 import numpy as np
 import pandas as pd
-from aiocache import Cache, cached
 from sqlalchemy import and_, case, func, join, select
 
 from api.models.common import DecimalTimeSeries
@@ -29,10 +28,11 @@ from database.models.cvxprisma import (
     StakingBalance,
     StakingSnapshot,
 )
+from utils.cache import shared_cached
 from utils.const import CVXPRISMA_STAKING
 
 
-@cached(ttl=60, cache=Cache.MEMORY)
+@shared_cached(ttl=60, namespace="staking")
 async def get_aggregated_flow(
     filter_set: FilterSet, staking_contract: str = CVXPRISMA_STAKING
 ) -> AggregateStakingFlowResponse:
@@ -83,7 +83,7 @@ async def get_aggregated_flow(
     )
 
 
-@cached(ttl=60, cache=Cache.MEMORY)
+@shared_cached(ttl=60, namespace="staking")
 async def get_aggregated_tvl(
     filter_set: FilterSet, staking_contract: str = CVXPRISMA_STAKING
 ) -> StakingTvlResponse:
@@ -124,7 +124,7 @@ async def get_aggregated_tvl(
     return StakingTvlResponse(tvl=tvl_timeseries)
 
 
-@cached(ttl=60, cache=Cache.MEMORY)
+@shared_cached(ttl=60, namespace="staking")
 async def get_aggregated_supply(
     filter_set: FilterSet, staking_contract: str = CVXPRISMA_STAKING
 ) -> StakingTotalSupplyResponse:
@@ -165,7 +165,7 @@ async def get_aggregated_supply(
     return StakingTotalSupplyResponse(supply=supply_timeseries)
 
 
-@cached(ttl=60, cache=Cache.MEMORY)
+@shared_cached(ttl=60, namespace="staking")
 async def get_snapshots(
     filter_set: PeriodFilterSet, staking_contract: str = CVXPRISMA_STAKING
 ) -> StakingSnapshotsResponse:
@@ -316,7 +316,7 @@ async def _get_stake_size(
     ]
 
 
-@cached(ttl=60, cache=Cache.MEMORY)
+@shared_cached(ttl=60, namespace="staking")
 async def get_user_details(
     user_id: str, staking_contract: str = CVXPRISMA_STAKING
 ) -> UserDetails:
@@ -382,7 +382,7 @@ async def get_user_details(
     return user_details
 
 
-@cached(ttl=60, cache=Cache.MEMORY)
+@shared_cached(ttl=60, namespace="staking")
 async def get_staking_balance_histogram(
     staking_contract: str = CVXPRISMA_STAKING,
 ) -> DistributionResponse:
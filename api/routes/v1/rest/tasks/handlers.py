@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+
+from api.fastapi import BaseMethodDescription, get_router_method_settings
+from api.logger import get_logger
+from api.routes.v1.rest.tasks.models import TaskMetrics, TaskMetricsResponse
+from services.task_lock import get_task_metrics
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    response_model=TaskMetricsResponse,
+    **get_router_method_settings(
+        BaseMethodDescription(
+            summary="Get runtime and overlap metrics of the sync jobs"
+        )
+    ),
+)
+async def get_metrics():
+    return TaskMetricsResponse(
+        tasks=[TaskMetrics(**m) for m in await get_task_metrics()]
+    )
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+
+
+class TaskMetrics(BaseModel):
+    task: str = Field(..., description="Name of the sync job")
+    chain: str
+    running: bool
+    runs: int = 0
+    skipped: int = Field(
+        0, description="Runs dropped because a previous one was still going"
+    )
+    coalesced: int = Field(
+        0, description="Runs folded into an extra run of the ongoing one"
+    )
+    last_runtime: float | None = None
+    max_runtime: float | None = None
+    total_runtime: float = 0
+    last_started_at: float | None = None
+    last_finished_at: float | None = None
+
+
+class TaskMetricsResponse(BaseModel):
+    tasks: list[TaskMetrics]
@@ -1,6 +1,22 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+from typing import Any
+
 import pandas as pd
-from sqlalchemy import String, and_, case, cast, desc, func, or_, select
-from sqlalchemy.orm import aliased
+from sqlalchemy import (
+    String,
+    and_,
+    case,
+    cast,
+    desc,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+)
 
 from api.models.common import Pagination
 from api.routes.v1.rest.trove.models import (
@@ -22,7 +38,9 @@ from database.models.troves import (
     TroveManager,
     TroveManagerSnapshot,
     TroveSnapshot,
+    TroveState,
 )
+from utils.cache import shared_cached
 
 
 def _map_trove_to_entry(trove, created_at, last_update, collateral_ratio):
@@ -44,12 +62,62 @@ def _map_trove_to_entry(trove, created_at, last_update, collateral_ratio):
     )
 
 
+def _encode_cursor(value: Any, trove_id: int) -> str:
+    payload = json.dumps(
+        [None if value is None else str(value), trove_id]
+    ).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _decode_cursor(cursor: str, order_by: str) -> tuple[Any, int]:
+    try:
+        value, trove_id = json.loads(base64.urlsafe_b64decode(cursor))
+        if value is not None and order_by != "owner":
+            value = Decimal(value)
+        return value, int(trove_id)
+    except (ValueError, TypeError, ArithmeticError, binascii.Error):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _after_cursor(column, value: Any, trove_id: int, descending: bool):
+    """
+    Filters rows coming after the cursor position. NULLs sort last when
+    ascending and first when descending, like postgres does by default, and
+    need their own conditions as tuple comparisons drop them.
+    """
+    position = tuple_(column, TroveState.trove_id)
+    if descending:
+        if value is None:
+            return or_(
+                column.isnot(None),
+                and_(column.is_(None), TroveState.trove_id < trove_id),
+            )
+        return position < tuple_(literal(value), literal(trove_id))
+    if value is None:
+        return and_(column.is_(None), TroveState.trove_id > trove_id)
+    return or_(
+        position > tuple_(literal(value), literal(trove_id)),
+        column.is_(None),
+    )
+
+
+@shared_cached(ttl=120, namespace="trove")
+async def count_troves(manager_id: int, owner_filter: str | None) -> int:
+    count_query = (
+        select([func.count()])
+        .select_from(TroveState)
+        .where(TroveState.manager_id == manager_id)
+    )
+    if owner_filter:
+        count_query = count_query.where(
+            TroveState.owner_id.ilike(f"%{owner_filter}%")
+        )
+    return await db.fetch_val(count_query)
+
+
 async def search_for_troves(
     manager_id: int, pagination: Pagination, filter_set: FilterSet
 ) -> TroveEntryResponse | None:
-    first_snapshot = aliased(TroveSnapshot)
-    last_snapshot = aliased(TroveSnapshot)
-
     collateral_price = await db.fetch_val(
         select([Collateral.latest_price])
         .join(TroveManager, TroveManager.collateral_id == Collateral.id)
@@ -61,68 +129,72 @@ async def search_for_troves(
     if collateral_price is None:
         return None
 
-    collateral_usd = (Trove.collateral * collateral_price).label(
-        "collateral_usd"
-    )
+    collateral_usd = Trove.collateral * collateral_price
     collateral_ratio = case(
         [(Trove.debt == 0, 0)], else_=(collateral_usd / Trove.debt)
-    ).label("collateral_ratio")
-
-    if filter_set.order_by in [
-        "last_update",
-        "created_at",
-        "collateral_ratio",
-    ]:
-        if filter_set.order_by == "last_update":
-            order_by_column = func.max(last_snapshot.block_timestamp)
-        elif filter_set.order_by == "created_at":
-            order_by_column = func.min(first_snapshot.block_timestamp)
-        else:
-            order_by_column = collateral_ratio
-    else:
-        order_by_column = getattr(Trove, filter_set.order_by)  # type: ignore
+    )
 
+    order_columns = {
+        "owner": (Trove.owner_id, "owner_id"),
+        "collateral_usd": (collateral_usd, "collateral_usd"),
+        "debt": (Trove.debt, "debt"),
+        "collateral_ratio": (collateral_ratio, "collateral_ratio"),
+        "created_at": (TroveState.first_timestamp, "created_at"),
+        "last_update": (TroveState.last_timestamp, "last_update"),
+    }
+    order_by_column, order_by_key = order_columns[
+        filter_set.order_by  # type: ignore
+    ]
+
+    # trove states only provide the snapshot timestamps, balances and status
+    # come from the trove itself
     query = (
         select(
+            TroveState.trove_id,
             Trove.owner_id,
             Trove.status,
-            collateral_usd,
+            collateral_usd.label("collateral_usd"),
             Trove.debt,
-            func.min(first_snapshot.block_timestamp).label("created_at"),
-            func.max(last_snapshot.block_timestamp).label("last_update"),
-            collateral_ratio,
+            TroveState.first_timestamp.label("created_at"),
+            TroveState.last_timestamp.label("last_update"),
+            collateral_ratio.label("collateral_ratio"),
         )
-        .join(first_snapshot, first_snapshot.trove_id == Trove.id)
-        .join(last_snapshot, last_snapshot.trove_id == Trove.id)
-        .join(TroveManager, TroveManager.id == Trove.manager_id)
-        .where(Trove.manager_id == manager_id)
-        .group_by(Trove.id)
+        .join(Trove, Trove.id == TroveState.trove_id)
+        .where(TroveState.manager_id == manager_id)
     )
 
     if filter_set.owner_filter:
         query = query.where(
-            Trove.owner_id.ilike(f"%{filter_set.owner_filter}%")
-        )
-
-    count_query = (
-        select([func.count()])
-        .select_from(Trove)
-        .where(Trove.manager_id == manager_id)
-    )
-
-    if filter_set.owner_filter:
-        count_query = count_query.where(
-            Trove.owner_id.ilike(f"%{filter_set.owner_filter}%")
+            TroveState.owner_id.ilike(f"%{filter_set.owner_filter}%")
         )
 
-    total_entries = await db.fetch_val(count_query)
+    total_entries = await count_troves(manager_id, filter_set.owner_filter)
     items = min(pagination.items, 100)
     page = pagination.page if pagination else 1
 
-    query = query.order_by(
-        desc(order_by_column) if filter_set.desc else order_by_column
-    )
-    query = query.offset((page - 1) * items).limit(items)
+    # keyset pagination on (order column, trove id) when a cursor is given,
+    # the trove id breaks ties so that no row is skipped or repeated
+    if filter_set.cursor:
+        cursor_value, cursor_id = _decode_cursor(
+            filter_set.cursor, filter_set.order_by  # type: ignore
+        )
+        query = query.where(
+            _after_cursor(
+                order_by_column, cursor_value, cursor_id, filter_set.desc
+            )
+        )
+    else:
+        query = query.offset((page - 1) * items)
+
+    if filter_set.desc:
+        query = query.order_by(
+            desc(order_by_column).nulls_first(), desc(TroveState.trove_id)
+        )
+    else:
+        query = query.order_by(
+            order_by_column.nulls_last(), TroveState.trove_id
+        )
+    query = query.limit(items)
 
     result = await db.fetch_all(query)
     if not result:
@@ -133,19 +205,28 @@ async def search_for_troves(
     trove_entries = [
         _map_trove_to_entry(
             {
-                "owner_id": row[0],
-                "status": row[1],
-                "collateral_usd": row[2],
-                "debt": row[3],
+                "owner_id": row["owner_id"],
+                "status": row["status"],
+                "collateral_usd": row["collateral_usd"],
+                "debt": row["debt"],
             },
-            row[4],
-            row[5],
-            row[6],
+            row["created_at"],
+            row["last_update"],
+            row["collateral_ratio"],
         )
         for row in result
     ]
+    last_row = result[-1]
+    next_cursor = (
+        _encode_cursor(last_row[order_by_key], last_row["trove_id"])
+        if len(result) == items
+        else None
+    )
     return TroveEntryResponse(
-        page=page, total_entries=total_entries, troves=trove_entries
+        page=page,
+        total_entries=total_entries,
+        troves=trove_entries,
+        next_cursor=next_cursor,
     )
 
 
@@ -282,7 +363,6 @@ async def get_snapshot_historical_stats(
 
 
 async def get_position(manager_id: int, owner_id: str) -> RatioPosition:
-
     latest_manager_snapshot = (
         select([TroveManagerSnapshot.collateral_price])
         .where(TroveManagerSnapshot.manager_id == manager_id)
@@ -290,50 +370,29 @@ async def get_position(manager_id: int, owner_id: str) -> RatioPosition:
         .limit(1)
     ).alias("latest_manager_snapshot")
 
-    subquery = (
-        select(
-            [
-                TroveSnapshot.trove_id,
-                func.max(TroveSnapshot.block_timestamp).label(
-                    "latest_timestamp"
-                ),
-            ]
-        )
-        .group_by(TroveSnapshot.trove_id)
-        .alias("subquery")
-    )
-
     query = (
         select(
             [
-                Trove.owner_id,
+                TroveState.owner_id,
                 case(
-                    [(TroveSnapshot.debt == 0, None)],
+                    [(TroveState.debt == 0, None)],
                     else_=(
                         (
-                            TroveSnapshot.collateral
+                            TroveState.collateral
                             * latest_manager_snapshot.c.collateral_price
                         )
-                        / TroveSnapshot.debt
+                        / TroveState.debt
                         * 100
                     ),
                 ).label("cr"),
                 (
-                    TroveSnapshot.collateral
+                    TroveState.collateral
                     * latest_manager_snapshot.c.collateral_price
                 ).label("collateral_usd"),
             ]
         )
-        .join(Trove, Trove.id == TroveSnapshot.trove_id)
-        .join(latest_manager_snapshot, Trove.manager_id == manager_id)
-        .join(
-            subquery,
-            and_(
-                TroveSnapshot.trove_id == subquery.c.trove_id,
-                TroveSnapshot.block_timestamp == subquery.c.latest_timestamp,
-            ),
-        )
-        .where(and_(Trove.manager_id == manager_id))
+        .join(latest_manager_snapshot, TroveState.manager_id == manager_id)
+        .where(TroveState.manager_id == manager_id)
     )
 
     results = await db.fetch_all(query)
@@ -390,8 +449,6 @@ async def get_position(manager_id: int, owner_id: str) -> RatioPosition:
 async def get_trove_details(
     manager_id: int, owner_id: str
 ) -> TroveEntry | None:
-    trove_snapshot = aliased(TroveSnapshot)
-
     collateral_price = await db.fetch_val(
         select([Collateral.latest_price])
         .join(TroveManager, TroveManager.collateral_id == Collateral.id)
@@ -410,18 +467,17 @@ async def get_trove_details(
                 Trove.status,
                 Trove.collateral,
                 Trove.debt,
-                func.min(trove_snapshot.block_timestamp).label("created_at"),
-                func.max(trove_snapshot.block_timestamp).label("last_update"),
+                TroveState.first_timestamp.label("created_at"),
+                TroveState.last_timestamp.label("last_update"),
             ]
         )
-        .join(trove_snapshot, trove_snapshot.trove_id == Trove.id)
-        .join(TroveManager, TroveManager.id == Trove.manager_id)
+        .join(Trove, Trove.id == TroveState.trove_id)
         .where(
             and_(
-                Trove.manager_id == manager_id, Trove.owner_id.ilike(owner_id)
+                Trove.manager_id == manager_id,
+                Trove.owner_id.ilike(owner_id),
             )
         )
-        .group_by(Trove.owner_id, Trove.status, Trove.collateral, Trove.debt)
     )
 
     row = await db.fetch_one(query)
@@ -45,7 +45,10 @@ async def get_troves(
     if not manager_id:
         raise HTTPException(status_code=404, detail="Manager not found")
 
-    result = await search_for_troves(manager_id, pagination, filter_set)
+    try:
+        result = await search_for_troves(manager_id, pagination, filter_set)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not result:
         raise HTTPException(status_code=404, detail="Data not found")
     return result
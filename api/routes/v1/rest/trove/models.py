@@ -33,12 +33,15 @@ class TroveEntryResponse(BaseModel):
     page: int
     total_entries: int
     troves: list[TroveEntry]
+    next_cursor: str | None = None
 
 
 class FilterSet(BaseModel):
     order_by: OrderBy = OrderBy.last_update
     desc: bool = True
     owner_filter: str | None
+    # opaque cursor returned by a previous page, takes precedence over page
+    cursor: str | None
 
     class Config:
         use_enum_values = True
@@ -2,7 +2,6 @@ from datetime import datetime
 
 import numpy as np
 import pandas as pd
-from aiocache import Cache, cached
 from sqlalchemy import String, and_, case, desc, distinct, func, select
 
 from api.models.common import (
@@ -12,7 +11,7 @@ from api.models.common import (
     Period,
 )
 from api.routes.utils.histogram import make_histogram
-from api.routes.utils.time import SECONDS_IN_DAY, apply_period
+from api.routes.utils.time import apply_period, apply_period_by_day
 from api.routes.v1.rest.trove_managers.models import (
     CollateralRatioDecilesData,
     CollateralRatioDistributionResponse,
@@ -33,19 +32,19 @@ from database.models.troves import (
     Collateral,
     Trove,
     TroveManager,
+    TroveManagerDailyRollup,
     TroveManagerSnapshot,
     TroveSnapshot,
+    TroveState,
 )
+from utils.cache import shared_cached
 
 
 async def get_historical_collateral_ratios(
     chain_id: int, period: Period
 ) -> HistoricalTroveOverviewResponse:
-    start_timestamp = apply_period(period)
-    rounded_timestamp = (
-        func.floor(TroveManagerSnapshot.block_timestamp / SECONDS_IN_DAY)
-        * SECONDS_IN_DAY
-    )
+    start_bucket = apply_period_by_day(period)
+    rounded_timestamp = TroveManagerDailyRollup.bucket
     unique_symbol = func.concat(
         Collateral.symbol,
         func.cast(" (", String),
@@ -57,18 +56,19 @@ async def get_historical_collateral_ratios(
         select(
             unique_symbol,
             rounded_timestamp.label("rounded_date"),
-            func.max(TroveManagerSnapshot.collateral_ratio).label(
+            func.max(TroveManagerDailyRollup.max_collateral_ratio).label(
                 "max_collateral_ratio"
             ),
         )
-        .join(TroveManager, TroveManager.id == TroveManagerSnapshot.manager_id)
+        .join(
+            TroveManager, TroveManager.id == TroveManagerDailyRollup.manager_id
+        )
         .join(Collateral, Collateral.id == TroveManager.collateral_id)
         .group_by(unique_symbol, rounded_timestamp)
         .filter(
-            (TroveManagerSnapshot.block_timestamp >= start_timestamp)
+            (TroveManagerDailyRollup.bucket >= start_bucket)
             & (TroveManager.chain_id == chain_id)
-            & (TroveManagerSnapshot.total_collateral_usd.isnot(None))
-            & (TroveManagerSnapshot.total_debt.isnot(None))
+            & (TroveManagerDailyRollup.max_collateral_ratio.isnot(None))
         )
         .order_by(rounded_timestamp)
     ).alias("average_collaterals")
@@ -95,30 +95,28 @@ async def get_historical_collateral_ratios(
     return HistoricalTroveOverviewResponse(managers=formatted_data)
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="trove_managers")
 async def get_global_collateral_ratio(
     chain_id: int, period: Period
 ) -> HistoricalTroveManagerData:
-
-    start_timestamp = apply_period(period)
-    rounded_timestamp = (
-        func.floor(TroveManagerSnapshot.block_timestamp / SECONDS_IN_DAY)
-        * SECONDS_IN_DAY
-    )
+    start_bucket = apply_period_by_day(period)
+    rounded_timestamp = TroveManagerDailyRollup.bucket
 
     subquery = (
         select(
             TroveManager.address,
             rounded_timestamp.label("rounded_date"),
-            func.avg(TroveManagerSnapshot.total_collateral_usd).label(
+            func.avg(TroveManagerDailyRollup.avg_total_collateral_usd).label(
                 "avg_collateral_usd"
             ),
-            func.avg(TroveManagerSnapshot.total_debt).label("avg_debt"),
+            func.avg(TroveManagerDailyRollup.avg_total_debt).label("avg_debt"),
+        )
+        .join(
+            TroveManager, TroveManager.id == TroveManagerDailyRollup.manager_id
         )
-        .join(TroveManager, TroveManager.id == TroveManagerSnapshot.manager_id)
         .filter(
             (TroveManager.chain_id == chain_id)
-            & (TroveManagerSnapshot.block_timestamp >= start_timestamp)
+            & (TroveManagerDailyRollup.bucket >= start_bucket)
         )
         .group_by(TroveManager.address, rounded_timestamp)
         .order_by(rounded_timestamp)
@@ -154,15 +152,12 @@ async def get_global_collateral_ratio(
     return HistoricalTroveManagerData(manager="global", data=data_points)
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="trove_managers")
 async def get_open_troves_overview(
     chain_id: int, period: Period
 ) -> HistoricalOpenedTrovesResponse:
-    start_timestamp = apply_period(period)
-    rounded_timestamp = (
-        func.floor(TroveManagerSnapshot.block_timestamp / SECONDS_IN_DAY)
-        * SECONDS_IN_DAY
-    )
+    start_bucket = apply_period_by_day(period)
+    rounded_timestamp = TroveManagerDailyRollup.bucket
     unique_symbol = func.concat(
         Collateral.symbol,
         func.cast(" (", String),
@@ -174,15 +169,17 @@ async def get_open_troves_overview(
         select(
             unique_symbol,
             rounded_timestamp.label("rounded_date"),
-            func.max(TroveManagerSnapshot.open_troves).label(
+            func.max(TroveManagerDailyRollup.max_open_troves).label(
                 "max_open_troves"
             ),
         )
-        .join(TroveManager, TroveManager.id == TroveManagerSnapshot.manager_id)
+        .join(
+            TroveManager, TroveManager.id == TroveManagerDailyRollup.manager_id
+        )
         .join(Collateral, Collateral.id == TroveManager.collateral_id)
         .filter(
             (TroveManager.chain_id == chain_id)
-            & (TroveManagerSnapshot.block_timestamp >= start_timestamp)
+            & (TroveManagerDailyRollup.bucket >= start_bucket)
         )
         .group_by(unique_symbol, rounded_timestamp)
     )
@@ -213,35 +210,10 @@ async def get_open_troves_overview(
     return HistoricalOpenedTrovesResponse(managers=trove_data_list)
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="trove_managers")
 async def get_health_overview(
     chain_id: int,
 ) -> CollateralRatioDistributionResponse:
-
-    open_troves = (
-        select([Trove.id.label("trove_id")])
-        .join(TroveManager, Trove.manager_id == TroveManager.id)
-        .where(
-            (Trove.status == Trove.TroveStatus.open)
-            & (TroveManager.chain_id == chain_id)
-        )
-        .alias()
-    )
-
-    latest_trove_snapshots = (
-        select(
-            [
-                TroveSnapshot.trove_id,
-                func.max(TroveSnapshot.block_timestamp).label(
-                    "latest_timestamp"
-                ),
-            ]
-        )
-        .where(and_(TroveSnapshot.trove_id.in_(open_troves), Trove.debt != 0))
-        .group_by(TroveSnapshot.trove_id)
-        .alias()
-    )
-
     last_manager_snapshots = (
         select(
             [
@@ -261,36 +233,34 @@ async def get_health_overview(
     trove_data_query = (
         select(
             [
-                TroveSnapshot.trove_id,
-                TroveSnapshot.debt,
+                TroveState.trove_id,
+                TroveState.debt,
                 (
-                    TroveSnapshot.collateral
+                    TroveState.collateral
                     * last_manager_snapshots.c.collateral_price
                 ).label("collateral_value"),
                 case(
-                    [(TroveSnapshot.debt == 0, 0)],
+                    [(TroveState.debt == 0, 0)],
                     else_=(
-                        TroveSnapshot.collateral
+                        TroveState.collateral
                         * last_manager_snapshots.c.collateral_price
                     )
-                    / TroveSnapshot.debt,
+                    / TroveState.debt,
                 ).label("collateral_ratio"),
             ]
         )
-        .join(
-            latest_trove_snapshots,
-            and_(
-                TroveSnapshot.trove_id == latest_trove_snapshots.c.trove_id,
-                TroveSnapshot.block_timestamp
-                == latest_trove_snapshots.c.latest_timestamp,
-            ),
-        )
-        .join(Trove, Trove.id == TroveSnapshot.trove_id)
+        .join(TroveManager, TroveManager.id == TroveState.manager_id)
         .join(
             last_manager_snapshots,
-            Trove.manager_id == last_manager_snapshots.c.manager_id,
+            TroveState.manager_id == last_manager_snapshots.c.manager_id,
+        )
+        .where(
+            and_(
+                TroveManager.chain_id == chain_id,
+                TroveState.status == Trove.TroveStatus.open,
+                TroveState.debt != 0,
+            )
         )
-        .where(Trove.status == Trove.TroveStatus.open)
     )
 
     trove_data = await db.fetch_all(trove_data_query)
@@ -315,15 +285,12 @@ async def get_health_overview(
     return CollateralRatioDistributionResponse(deciles=deciles_data)
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="trove_managers")
 async def get_historical_collateral_usd(
     chain_id: int, period: Period
 ) -> HistoricalTroveOverviewResponse:
-    start_timestamp = apply_period(period)
-    rounded_timestamp = (
-        func.floor(TroveManagerSnapshot.block_timestamp / SECONDS_IN_DAY)
-        * SECONDS_IN_DAY
-    )
+    start_bucket = apply_period_by_day(period)
+    rounded_timestamp = TroveManagerDailyRollup.bucket
     unique_symbol = func.concat(
         Collateral.symbol,
         func.cast(" (", String),
@@ -335,17 +302,19 @@ async def get_historical_collateral_usd(
         select(
             unique_symbol,
             rounded_timestamp.label("rounded_date"),
-            func.max(TroveManagerSnapshot.total_collateral_usd).label(
+            func.max(TroveManagerDailyRollup.max_total_collateral_usd).label(
                 "max_collateral_usd"
             ),
         )
-        .join(TroveManager, TroveManager.id == TroveManagerSnapshot.manager_id)
+        .join(
+            TroveManager, TroveManager.id == TroveManagerDailyRollup.manager_id
+        )
         .join(Collateral, Collateral.id == TroveManager.collateral_id)
         .group_by(unique_symbol, rounded_timestamp)
         .filter(
             (TroveManager.chain_id == chain_id)
-            & (TroveManagerSnapshot.block_timestamp >= start_timestamp)
-            & (TroveManagerSnapshot.total_collateral_usd.isnot(None))
+            & (TroveManagerDailyRollup.bucket >= start_bucket)
+            & (TroveManagerDailyRollup.max_total_collateral_usd.isnot(None))
         )
         .order_by(rounded_timestamp)
     ).alias("average_collaterals")
@@ -398,11 +367,10 @@ async def get_debt_histogram(manager_id: int) -> DistributionResponse:
     return DistributionResponse(distribution=distrib)
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="trove_managers")
 async def get_large_positions(
     manager_id: int, top_values: int, denomination: CollateralVsDebt
 ) -> LargePositionsResponse:
-
     if denomination.unit == Denomination.collateral.value:
         column = Trove.collateral_usd
     else:
@@ -448,7 +416,7 @@ async def get_large_positions(
     return LargePositionsResponse(positions=results)
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="trove_managers")
 async def get_vault_recent_events(manager_id: int, period: Period):
     start_timestamp = apply_period(period)
     liquidations_7d = await db.fetch_val(
@@ -485,7 +453,7 @@ async def get_vault_recent_events(manager_id: int, period: Period):
     return trove_overview
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="trove_managers")
 async def get_vault_cr(
     manager_id: int, period: Period
 ) -> SingleVaultCollateralRatioResponse:
@@ -511,7 +479,7 @@ async def get_vault_cr(
     return SingleVaultCollateralRatioResponse(ratio=ratio)
 
 
-@cached(ttl=300, cache=Cache.MEMORY)
+@shared_cached(ttl=300, namespace="trove_managers")
 async def get_vault_count(
     manager_id: int, period: Period
 ) -> SingleVaultTroveCountResponse:
@@ -12,6 +12,7 @@ from api.routes.v1.rest.stability_pool.handlers import (
     router as stability_pool_router,
 )
 from api.routes.v1.rest.staking.handlers import router as staking_router
+from api.routes.v1.rest.tasks.handlers import router as tasks_router
 from api.routes.v1.rest.trove.handlers import router as trove_router
 from api.routes.v1.rest.trove_managers.handlers import (
     router as trove_manager_router,
@@ -70,6 +71,11 @@ http_routers = [
         "tags": ["dao"],
         "prefix": "/dao",
     },
+    {
+        "router": tasks_router,
+        "tags": ["tasks"],
+        "prefix": "/tasks",
+    },
 ]
 
 ws_routers = [
@@ -83,3 +83,6 @@ async def websocket_endpoint(websocket: WebSocket):
             )
         except Exception as e:
             logger.error(e)
+            if websocket not in manager.active_connections:
+                # dropped by the manager, e.g. as a slow consumer
+                break
@@ -0,0 +1,35 @@
+import logging
+
+from api.routes.v1.websocket.manager import manager
+from api.routes.v1.websocket.models import Channels
+from services.messaging.invalidation import (
+    Dataset,
+    DatasetChangedPayload,
+    cache_invalidation_callback,
+)
+from utils.const import CHAINS
+
+logger = logging.getLogger()
+
+
+def invalidate_snapshots(dataset: Dataset, chain_id: int):
+    """
+    Drops the rendered snapshots built from a changed dataset. Live
+    updates already do so for the rows they carry, this covers the ones
+    that are not pushed such as back-filled history.
+    """
+    for chain in [name for name, id in CHAINS.items() if id == chain_id]:
+        if dataset == Dataset.troves:
+            manager.invalidate_rendered_prefix(
+                f"{Channels.trove_operations.value}_{chain}_"
+            )
+        elif dataset == Dataset.stability_pool:
+            # stability pool subscriptions are keyed on the overview channel
+            manager.invalidate_rendered(
+                f"{Channels.troves_overview.value}_{chain}"
+            )
+
+
+async def dataset_changed_callback(payload: DatasetChangedPayload):
+    invalidate_snapshots(payload.dataset, payload.chain_id)
+    await cache_invalidation_callback(payload)
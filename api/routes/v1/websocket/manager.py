@@ -1,37 +1,175 @@
+import asyncio
 import logging
-from typing import Type
+import time
+from typing import Awaitable, Callable, Type
 
+import orjson
 from fastapi import WebSocket
 from pydantic import BaseModel
 
+from api.fastapi import custom_json_encoder
+
 logger = logging.getLogger(__name__)
 
+# messages buffered per connection before it is considered slow
+SEND_QUEUE_SIZE = 64
+# messages dropped for a connection that has not caught up since before
+# disconnecting it
+SLOW_CONSUMER_DROP_LIMIT = 32
+SEND_TIMEOUT = 10
+# rendered snapshots are rebuilt past this age, in case an update was not
+# pushed (e.g. back-filled history), and at most this many are kept per
+# channel
+RENDERED_MAX_AGE = 60
+RENDERED_PER_CHANNEL = 256
+
+
+def render_payload(payload: BaseModel) -> str:
+    """
+    Serializes a payload once so the same string is sent to every
+    subscriber.
+    """
+    return orjson.dumps(payload.dict(), default=custom_json_encoder).decode()
+
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: dict[WebSocket, set[str]] = {}
+        self.subscribers: dict[str, set[WebSocket]] = {}
         self.subscription_settings: dict[str, Type[BaseModel]] = {}
+        self.send_queues: dict[WebSocket, asyncio.Queue] = {}
+        self.writers: dict[WebSocket, asyncio.Task] = {}
+        self.dropped: dict[WebSocket, int] = {}
+        # slow consumers with a disconnect scheduled, and those disconnects
+        self.closing: set[WebSocket] = set()
+        self.disconnect_tasks: set[asyncio.Task] = set()
+        # rendered snapshots per subscription channel with the time they
+        # were started, kept until its next update or until they expire
+        self.rendered: dict[str, dict[str, tuple[float, asyncio.Future]]] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections[websocket] = set()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.send_queues[websocket] = queue
+        self.dropped[websocket] = 0
+        self.writers[websocket] = asyncio.create_task(
+            self._writer(websocket, queue)
+        )
+
+    def _remove(self, websocket: WebSocket) -> asyncio.Task | None:
+        for channel in self.active_connections.pop(websocket, set()):
+            sockets = self.subscribers.get(channel)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self.subscribers[channel]
+        self.send_queues.pop(websocket, None)
+        self.dropped.pop(websocket, None)
+        self.closing.discard(websocket)
+        return self.writers.pop(websocket, None)
 
     async def disconnect(self, websocket: WebSocket):
-        del self.active_connections[websocket]
-        await websocket.close()
+        writer = self._remove(websocket)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        try:
+            await websocket.close()
+        except Exception:
+            # the client may already be gone
+            pass
+
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        while True:
+            message = await queue.get()
+            try:
+                await asyncio.wait_for(
+                    websocket.send_text(message), timeout=SEND_TIMEOUT
+                )
+                # a client still behind keeps its count, otherwise one that
+                # only gets some of the messages through is never dropped
+                if websocket in self.dropped and queue.empty():
+                    self.dropped[websocket] = 0
+            except Exception as e:
+                logger.error(f"Error sending message to {websocket}: {e}")
+                await self.disconnect(websocket)
+                return
+
+    def enqueue(self, websocket: WebSocket, message: str):
+        """
+        Queues a message for a connection without waiting on the client.
+        A connection whose queue is full loses its oldest message, one that
+        keeps falling behind is disconnected.
+        """
+        queue = self.send_queues.get(websocket)
+        if queue is None or websocket in self.closing:
+            return
+        if queue.full():
+            queue.get_nowait()
+            self.dropped[websocket] += 1
+            if self.dropped[websocket] > SLOW_CONSUMER_DROP_LIMIT:
+                logger.warning(f"Disconnecting slow consumer {websocket}")
+                self.closing.add(websocket)
+                task = asyncio.create_task(self.disconnect(websocket))
+                self.disconnect_tasks.add(task)
+                task.add_done_callback(self.disconnect_tasks.discard)
+                return
+        queue.put_nowait(message)
 
     async def broadcast(self, message: str, channel: str):
-        for connection, subscriptions in self.active_connections.items():
-            if channel in subscriptions:
-                await connection.send_text(message)
+        for connection in list(self.subscribers.get(channel, ())):
+            self.enqueue(connection, message)
+
+    async def render_cached(
+        self,
+        channel: str,
+        subscription: BaseModel,
+        build: Callable[[], Awaitable[BaseModel]],
+        max_age: float = RENDERED_MAX_AGE,
+    ) -> str:
+        """
+        Returns the rendered payload for a subscription channel, building
+        it at most once until the channel is next updated or the payload
+        is older than `max_age`. Payloads echo the subscription back, so
+        they are only shared between clients that subscribed with the same
+        settings.
+        """
+        cache = self.rendered.setdefault(channel, {})
+        key = subscription.json(sort_keys=True)
+        now = time.monotonic()
+        entry = cache.get(key)
+        if entry is not None and now - entry[0] <= max_age:
+            future = entry[1]
+        else:
 
-    @staticmethod
-    async def send_message(websocket: WebSocket, message: str):
+            async def render() -> str:
+                return render_payload(await build())
+
+            for stale in [
+                k for k, (at, _) in cache.items() if now - at > max_age
+            ]:
+                del cache[stale]
+            if len(cache) >= RENDERED_PER_CHANNEL:
+                del cache[next(iter(cache))]
+            future = asyncio.ensure_future(render())
+            cache[key] = (now, future)
         try:
-            await websocket.send_text(message)
-        except Exception as e:
-            logger.error(f"Error sending message: {e}")
-            pass
+            return await asyncio.shield(future)
+        except Exception:
+            cached = self.rendered.get(channel, {}).get(key)
+            if cached is not None and cached[1] is future:
+                del self.rendered[channel][key]
+            raise
+
+    def invalidate_rendered(self, channel: str):
+        self.rendered.pop(channel, None)
+
+    def invalidate_rendered_prefix(self, prefix: str):
+        for channel in [c for c in self.rendered if c.startswith(prefix)]:
+            del self.rendered[channel]
+
+    async def send_message(self, websocket: WebSocket, message: str):
+        self.enqueue(websocket, message)
 
     def subscribe(
         self, websocket: WebSocket, channel: str, subscription: Type[BaseModel]
@@ -40,6 +178,7 @@ class ConnectionManager:
             self.subscription_settings[channel] = subscription
         if websocket in self.active_connections:
             self.active_connections[websocket].add(channel)
+            self.subscribers.setdefault(channel, set()).add(websocket)
 
     def unsubscribe(self, websocket: WebSocket, channel: str):
         if (
@@ -47,6 +186,10 @@ class ConnectionManager:
             and channel in self.active_connections[websocket]
         ):
             self.active_connections[websocket].remove(channel)
+            sockets = self.subscribers[channel]
+            sockets.discard(websocket)
+            if not sockets:
+                del self.subscribers[channel]
 
 
 manager = ConnectionManager()
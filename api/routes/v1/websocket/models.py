@@ -23,3 +23,4 @@ class Interval(Enum):
 class Payload(Enum):
     update = "update"
     snapshot = "snapshot"
+    delta = "delta"
@@ -1,6 +1,6 @@
 import logging
 
-from api.routes.v1.websocket.manager import manager
+from api.routes.v1.websocket.manager import manager, render_payload
 from api.routes.v1.websocket.stability_pool.models import StabilityPoolPayload
 
 logger = logging.getLogger()
@@ -8,4 +8,5 @@ logger = logging.getLogger()
 
 async def stability_pool_callback(data: StabilityPoolPayload):
     channel_sub = f"{data.channel}_{data.subscription.chain}"
-    await manager.broadcast(data.json(), channel_sub)
+    manager.invalidate_rendered(channel_sub)
+    await manager.broadcast(render_payload(data), channel_sub)
@@ -37,14 +37,19 @@ async def parse_stability_pool_client_message(
                 if settings.pagination
                 else 10
             )
-            operations = await get_pool_operations(chain_id, page, items)
-            data = StabilityPoolPayload(
-                channel=channel,
-                subscription=settings,
-                type=Payload.snapshot,
-                payload=operations,
+
+            async def build_snapshot() -> StabilityPoolPayload:
+                return StabilityPoolPayload(
+                    channel=channel,
+                    subscription=settings,
+                    type=Payload.snapshot,
+                    payload=await get_pool_operations(chain_id, page, items),
+                )
+
+            data = await manager.render_cached(
+                channel_sub, settings, build_snapshot
             )
-            await manager.send_message(websocket, data.json())
+            await manager.send_message(websocket, data)
 
         elif action == Action.unsubscribe:
-            await manager.unsubscribe(websocket, channel_sub)
+            manager.unsubscribe(websocket, channel_sub)
@@ -1,6 +1,6 @@
 import logging
 
-from api.routes.v1.websocket.manager import manager
+from api.routes.v1.websocket.manager import manager, render_payload
 from api.routes.v1.websocket.trove_operations.models import (
     TroveOperationsPayload,
 )
@@ -12,4 +12,5 @@ async def trove_operations_callback(data: TroveOperationsPayload):
     channel_sub = (
         f"{data.channel}_{data.subscription.chain}_{data.subscription.manager}"
     )
-    await manager.broadcast(data.json(), channel_sub)
+    manager.invalidate_rendered(channel_sub)
+    await manager.broadcast(render_payload(data), channel_sub)
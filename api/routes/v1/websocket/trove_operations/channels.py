@@ -48,14 +48,21 @@ async def parse_trove_operation_client_message(
                 if settings.pagination
                 else 10
             )
-            operations = await get_trove_operations(manager_id, page, items)
-            data = TroveOperationsPayload(
-                channel=channel,
-                subscription=settings,
-                type=Payload.snapshot,
-                payload=operations,
+
+            async def build_snapshot() -> TroveOperationsPayload:
+                return TroveOperationsPayload(
+                    channel=channel,
+                    subscription=settings,
+                    type=Payload.snapshot,
+                    payload=await get_trove_operations(
+                        manager_id, page, items
+                    ),
+                )
+
+            data = await manager.render_cached(
+                channel_sub, settings, build_snapshot
             )
-            await manager.send_message(websocket, data.json())
+            await manager.send_message(websocket, data)
 
         elif action == Action.unsubscribe:
-            await manager.unsubscribe(websocket, channel_sub)
+            manager.unsubscribe(websocket, channel_sub)
@@ -1,14 +1,15 @@
 import logging
 
-from api.routes.v1.websocket.manager import manager
+from api.routes.v1.websocket.manager import manager, render_payload
 from api.routes.v1.websocket.models import Channels, Payload
-from api.routes.v1.websocket.troves_overview.crud import (
-    get_trove_manager_details,
-)
 from api.routes.v1.websocket.troves_overview.models import (
+    TroveOverviewDeltaPayload,
     TroveOverviewPayload,
     TroveOverviewSettings,
 )
+from api.routes.v1.websocket.troves_overview.state import (
+    refresh_overview_state,
+)
 from utils.const import CHAINS
 
 logger = logging.getLogger()
@@ -18,11 +19,22 @@ async def trove_overview_callback(data: TroveOverviewSettings):
     chain_id = CHAINS[data.chain]
     channel = Channels.troves_overview.value
     channel_sub = f"{channel}_{chain_id}"
-    markets = await get_trove_manager_details(chain_id)
+    state, changes = await refresh_overview_state(chain_id)
+    manager.invalidate_rendered(channel_sub)
     payload = TroveOverviewPayload(
         channel=channel,
         subscription=data,
         type=Payload.update,
-        payload=markets,
+        sequence=state.sequence,
+        payload=list(state.markets.values()),
     )
-    await manager.broadcast(payload.json(), channel_sub)
+    await manager.broadcast(render_payload(payload), channel_sub)
+    if changes:
+        delta = TroveOverviewDeltaPayload(
+            channel=channel,
+            subscription=TroveOverviewSettings(chain=data.chain, delta=True),
+            type=Payload.delta,
+            sequence=state.sequence,
+            payload=changes,
+        )
+        await manager.broadcast(render_payload(delta), f"{channel_sub}_delta")
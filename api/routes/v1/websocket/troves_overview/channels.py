@@ -4,13 +4,15 @@ from fastapi import WebSocket
 
 from api.routes.v1.websocket.manager import manager
 from api.routes.v1.websocket.models import Action, Channels, Payload
-from api.routes.v1.websocket.troves_overview.crud import (
-    get_trove_manager_details,
-)
 from api.routes.v1.websocket.troves_overview.models import (
     TroveOverviewPayload,
     TroveOverviewSettings,
 )
+from api.routes.v1.websocket.troves_overview.state import (
+    get_overview_state,
+    overview_is_stale,
+    refresh_overview_state,
+)
 from utils.const import CHAINS
 
 logger = logging.getLogger()
@@ -30,17 +32,31 @@ async def parse_trove_overview_client_message(
         chain_id = CHAINS[settings.chain]
         channel = Channels.troves_overview.value
         channel_sub = f"{channel}_{chain_id}"
+        # delta subscribers resync from a snapshot when they miss a sequence
+        update_sub = f"{channel_sub}_delta" if settings.delta else channel_sub
         if action == Action.subscribe:
-            manager.subscribe(websocket, channel_sub, settings)
+            manager.subscribe(websocket, update_sub, settings)
         elif action == Action.snapshots:
-            markets = await get_trove_manager_details(chain_id)
-            data = TroveOverviewPayload(
-                channel=channel,
-                subscription=settings,
-                type=Payload.snapshot,
-                payload=markets,
+            if overview_is_stale(chain_id):
+                # reloaded here rather than in the build so snapshots
+                # rendered from the previous state are dropped as well
+                await refresh_overview_state(chain_id)
+                manager.invalidate_rendered(channel_sub)
+
+            async def build_snapshot() -> TroveOverviewPayload:
+                state = await get_overview_state(chain_id)
+                return TroveOverviewPayload(
+                    channel=channel,
+                    subscription=settings,
+                    type=Payload.snapshot,
+                    sequence=state.sequence,
+                    payload=list(state.markets.values()),
+                )
+
+            data = await manager.render_cached(
+                channel_sub, settings, build_snapshot
             )
-            await manager.send_message(websocket, data.json())
+            await manager.send_message(websocket, data)
 
         elif action == Action.unsubscribe:
-            await manager.unsubscribe(websocket, channel_sub)
+            manager.unsubscribe(websocket, update_sub)
@@ -1,3 +1,5 @@
+from typing import Any
+
 from pydantic import BaseModel
 
 from api.routes.v1.websocket.models import Payload
@@ -22,10 +24,21 @@ class TroveManagerDetails(BaseModel):
 
 class TroveOverviewSettings(BaseModel):
     chain: str
+    # receive only the changed managers and fields of each update
+    delta: bool = False
 
 
 class TroveOverviewPayload(BaseModel):
     channel: str
     subscription: TroveOverviewSettings
     type: Payload
+    sequence: int | None = None
     payload: list[TroveManagerDetails]
+
+
+class TroveOverviewDeltaPayload(BaseModel):
+    channel: str
+    subscription: TroveOverviewSettings
+    type: Payload
+    sequence: int
+    payload: list[dict[str, Any]]
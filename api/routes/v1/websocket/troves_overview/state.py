@@ -0,0 +1,87 @@
+import time
+from typing import Any, NamedTuple
+
+from api.routes.v1.websocket.troves_overview.crud import (
+    get_trove_manager_details,
+)
+from api.routes.v1.websocket.troves_overview.models import TroveManagerDetails
+
+# state older than this is reloaded before being served, in case an update
+# was missed
+OVERVIEW_MAX_AGE = 300
+
+OverviewState = NamedTuple(
+    "OverviewState",
+    [
+        ("sequence", int),
+        ("markets", dict[str, TroveManagerDetails]),
+        ("refreshed_at", float),
+    ],
+)
+
+# last overview sent per chain, deltas are computed against it
+overview_states: dict[int, OverviewState] = {}
+
+
+def diff_markets(
+    previous: dict[str, TroveManagerDetails],
+    current: dict[str, TroveManagerDetails],
+) -> list[dict[str, Any]]:
+    """
+    Returns the changed fields of each manager, keyed by address. New
+    managers are returned in full.
+    """
+    changes = []
+    for address, details in current.items():
+        fields = details.dict()
+        if address in previous:
+            before = previous[address].dict()
+            fields = {
+                key: value
+                for key, value in fields.items()
+                if before[key] != value
+            }
+            if not fields:
+                continue
+        changes.append({"address": address, **fields})
+    return changes
+
+
+def overview_is_stale(chain_id: int) -> bool:
+    state = overview_states.get(chain_id)
+    return state is None or time.time() - state.refreshed_at > OVERVIEW_MAX_AGE
+
+
+async def get_overview_state(chain_id: int) -> OverviewState:
+    if overview_is_stale(chain_id):
+        # delta subscribers see the sequence jump and resync from a snapshot
+        state, _ = await refresh_overview_state(chain_id)
+        return state
+    return overview_states[chain_id]
+
+
+async def refresh_overview_state(
+    chain_id: int,
+) -> tuple[OverviewState, list[dict[str, Any]]]:
+    """
+    Reloads the overview of a chain and returns the new state along with
+    the changes since the previous one. The sequence only moves when
+    something changed.
+    """
+    previous = overview_states.get(chain_id)
+    markets = await get_trove_manager_details(chain_id)
+    current = {market.address: market for market in markets}
+    if previous is None:
+        state = OverviewState(
+            sequence=0, markets=current, refreshed_at=time.time()
+        )
+        changes = diff_markets({}, current)
+    else:
+        changes = diff_markets(previous.markets, current)
+        state = OverviewState(
+            sequence=previous.sequence + (1 if changes else 0),
+            markets=current,
+            refreshed_at=time.time(),
+        )
+    overview_states[chain_id] = state
+    return state, changes
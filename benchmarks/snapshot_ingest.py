@@ -0,0 +1,130 @@
+"""
+Measures trove snapshot ingestion throughput against the configured
+database, writing a page in one batch versus one snapshot at a time (the
+round trip pattern ingestion had before batching). Everything runs in a
+transaction that is rolled back, so no data is left behind.
+
+    python -m benchmarks.snapshot_ingest <manager_id> [page_size] [pages]
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import select
+
+from database.engine import db, wrap_dbs
+from database.models.troves import TroveManager
+from services.sync.trove_snapshots import _ingest_snapshots
+
+BENCHMARK_INDEX_OFFSET = 10**9
+
+
+def _synthetic_page(page: int, page_size: int) -> list[dict]:
+    snapshots = []
+    for i in range(page_size):
+        index = BENCHMARK_INDEX_OFFSET + page * page_size + i
+        owner = f"0x{index:040x}"
+        # one snapshot out of 50 is a liquidation, one out of 50 a redemption
+        liquidation = (
+            {
+                "id": f"liquidation-{index}",
+                "liquidator": {"id": owner},
+                "liquidatedDebt": "1",
+                "liquidatedCollateral": "1",
+                "liquidatedCollateralUSD": "1",
+                "collGasCompensation": "0",
+                "collGasCompensationUSD": "0",
+                "debtGasCompensation": "0",
+                "blockNumber": index,
+                "blockTimestamp": index,
+                "transactionHash": f"0x{index:064x}",
+            }
+            if i % 50 == 0
+            else None
+        )
+        redemption = (
+            {
+                "id": f"redemption-{index}",
+                "redeemer": {"id": owner},
+                "attemptedDebtAmount": "1",
+                "actualDebtAmount": "1",
+                "collateralSent": "1",
+                "collateralSentUSD": "1",
+                "collateralSentToRedeemer": "1",
+                "collateralSentToRedeemerUSD": "1",
+                "collateralFee": "0",
+                "collateralFeeUSD": "0",
+                "blockNumber": index,
+                "blockTimestamp": index,
+                "transactionHash": f"0x{index:064x}",
+            }
+            if i % 50 == 25
+            else None
+        )
+        snapshots.append(
+            {
+                "trove": {
+                    "owner": {"id": owner},
+                    "status": "open",
+                    "snapshotsCount": 1,
+                    "collateral": "10",
+                    "collateralUSD": "20000",
+                    "collateralRatio": "2",
+                    "debt": "10000",
+                    "stake": "10",
+                    "rewardSnapshotDebt": "0",
+                    "rewardSnapshotCollateral": "0",
+                },
+                "operation": "openTrove",
+                "index": index,
+                "collateral": "10",
+                "collateralUSD": "20000",
+                "collateralRatio": "2",
+                "debt": "10000",
+                "stake": "10",
+                "borrowingFee": "50",
+                "liquidation": liquidation,
+                "redemption": redemption,
+                "blockNumber": index,
+                "blockTimestamp": index,
+                "transactionHash": f"0x{index:064x}",
+            }
+        )
+    return snapshots
+
+
+async def benchmark(manager_id: int, page_size: int = 1000, pages: int = 3):
+    chain_id = await db.fetch_val(
+        select([TroveManager.chain_id]).where(TroveManager.id == manager_id)
+    )
+    if chain_id is None:
+        raise Exception(f"Unknown manager {manager_id}")
+
+    results = {}
+    async with db.transaction(force_rollback=True):
+        for mode in ["per_row", "batched"]:
+            rows = 0
+            start = time.perf_counter()
+            for page in range(pages):
+                # distinct indexes per mode so each run inserts fresh rows
+                snapshots = _synthetic_page(
+                    page + (pages if mode == "batched" else 0), page_size
+                )
+                if mode == "batched":
+                    await _ingest_snapshots(chain_id, manager_id, snapshots)
+                else:
+                    for snapshot in snapshots:
+                        await _ingest_snapshots(
+                            chain_id, manager_id, [snapshot]
+                        )
+                rows += len(snapshots)
+            results[mode] = rows / (time.perf_counter() - start)
+
+    for mode, throughput in results.items():
+        print(f"{mode}: {throughput:.0f} snapshots/s")
+    print(f"speedup: {results['batched'] / results['per_row']:.1f}x")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    asyncio.run(wrap_dbs(benchmark)(*args))
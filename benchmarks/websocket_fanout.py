@@ -0,0 +1,165 @@
+"""
+Measures WebSocket fan-out with simulated clients: how long a broadcast
+holds the event loop, how quickly healthy clients receive messages, and
+when slow or stalled clients are dropped. Runs the connection manager
+against the sequential broadcast it replaced, so the slow consumer limit
+and send timeout can be checked against a given message rate.
+
+    python -m benchmarks.websocket_fanout \
+        [clients] [slow_clients] [messages] [interval]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from pydantic import BaseModel
+
+from api.routes.v1.websocket.manager import (
+    SEND_QUEUE_SIZE,
+    SEND_TIMEOUT,
+    SLOW_CONSUMER_DROP_LIMIT,
+    ConnectionManager,
+)
+
+CHANNEL = "benchmark"
+# time a healthy client takes to write a message
+FAST_SEND_DELAY = 0.001
+# a slow client writes far below the broadcast rate
+SLOW_SEND_DELAY = 0.5
+
+
+class BenchmarkSettings(BaseModel):
+    pass
+
+
+class SimulatedSocket:
+    def __init__(self, send_delay: float | None):
+        # None never completes a send, like a client that stopped reading
+        self.send_delay = send_delay
+        self.latencies: list[float] = []
+        self.closed_at: float | None = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.send_delay is None:
+            await asyncio.Event().wait()
+        else:
+            await asyncio.sleep(self.send_delay)
+        self.latencies.append(time.perf_counter() - float(message))
+
+    async def close(self):
+        self.closed_at = time.perf_counter()
+
+
+def _sockets(clients: int, slow_clients: int) -> list[SimulatedSocket]:
+    stalled = slow_clients // 2
+    return (
+        [SimulatedSocket(FAST_SEND_DELAY) for _ in range(clients)]
+        + [
+            SimulatedSocket(SLOW_SEND_DELAY)
+            for _ in range(slow_clients - stalled)
+        ]
+        + [SimulatedSocket(None) for _ in range(stalled)]
+    )
+
+
+async def _sequential_broadcast(sockets: list[SimulatedSocket], message: str):
+    # the broadcast before send queues: every client is awaited in turn
+    for socket in sockets:
+        await socket.send_text(message)
+
+
+async def _run(
+    mode: str, clients: int, slow_clients: int, messages: int, interval: float
+) -> dict:
+    sockets = _sockets(clients, slow_clients)
+    manager = ConnectionManager()
+    for socket in sockets:
+        await manager.connect(socket)
+        manager.subscribe(socket, CHANNEL, BenchmarkSettings)
+
+    broadcast_times = []
+    started_at = time.perf_counter()
+    for _ in range(messages):
+        message = str(time.perf_counter())
+        start = time.perf_counter()
+        if mode == "queued":
+            await manager.broadcast(message, CHANNEL)
+        else:
+            try:
+                await asyncio.wait_for(
+                    _sequential_broadcast(sockets, message),
+                    timeout=SEND_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                pass
+        broadcast_times.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    # let the writers drain what is still queued
+    await asyncio.sleep(SLOW_SEND_DELAY)
+    finished_at = time.perf_counter()
+    for socket in list(manager.active_connections):
+        await manager.disconnect(socket)
+
+    fast = sockets[:clients]
+    latencies = sorted(lat for s in fast for lat in s.latencies)
+    dropped = [
+        s.closed_at - started_at
+        for s in sockets[clients:]
+        if s.closed_at is not None and s.closed_at < finished_at
+    ]
+    return {
+        "broadcast_ms": 1000 * statistics.mean(broadcast_times),
+        "broadcast_max_ms": 1000 * max(broadcast_times),
+        "delivered": len(latencies) / (clients * messages),
+        "p50_ms": 1000 * latencies[len(latencies) // 2] if latencies else 0,
+        "p99_ms": (
+            1000 * latencies[int(len(latencies) * 0.99)] if latencies else 0
+        ),
+        "slow_dropped": len(dropped),
+        "slow_dropped_after_s": max(dropped, default=0),
+    }
+
+
+async def benchmark(
+    clients: int = 1000,
+    slow_clients: int = 10,
+    messages: int = 200,
+    interval: float = 0.05,
+):
+    print(
+        f"{clients} clients, {slow_clients} slow, {messages} messages every"
+        f" {interval}s (queue {SEND_QUEUE_SIZE}, drop limit"
+        f" {SLOW_CONSUMER_DROP_LIMIT}, send timeout {SEND_TIMEOUT}s)"
+    )
+    # slow consumers are only dropped once their queue is full and they
+    # missed the drop limit on top of it, stalled ones at the latest when
+    # their send times out
+    behind = SEND_QUEUE_SIZE + SLOW_CONSUMER_DROP_LIMIT + 1
+    print(
+        f"expected drops: lagging clients after ~{behind * interval:.1f}s,"
+        f" stalled clients after at most"
+        f" {min(behind * interval, SEND_TIMEOUT):.1f}s"
+    )
+    for mode in ["sequential", "queued"]:
+        # the sequential broadcast is cut short, it only needs to show the
+        # stall
+        count = messages if mode == "queued" else min(messages, 3)
+        results = await _run(mode, clients, slow_clients, count, interval)
+        print(
+            f"{mode}: broadcast {results['broadcast_ms']:.2f}ms"
+            f" (max {results['broadcast_max_ms']:.2f}ms),"
+            f" delivered {results['delivered']:.1%},"
+            f" latency p50 {results['p50_ms']:.1f}ms"
+            f" p99 {results['p99_ms']:.1f}ms,"
+            f" {results['slow_dropped']}/{slow_clients} slow consumers"
+            f" dropped within {results['slow_dropped_after_s']:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    args = [float(a) for a in sys.argv[1:]]
+    asyncio.run(benchmark(*[int(a) for a in args[:3]], *args[3:]))
@@ -1,23 +1,73 @@
+import asyncio
 from functools import wraps
+from typing import Any, Awaitable, Callable
 
 import databases
 
 from services.messaging.redis import close_redis, get_redis_client
 from settings.config import settings
+from utils.http import close_http_session, get_http_session
 
 db = databases.Database(settings.pg_conn_str(), min_size=5, max_size=50)
 
+# event loop owned by a celery worker process, started on process init so
+# that tasks reuse its connection pools
+worker_loop: asyncio.AbstractEventLoop | None = None
+
+
+async def _connect():
+    await get_redis_client("celery")
+    await get_http_session()
+    await db.connect()
+
+
+async def _disconnect():
+    await db.disconnect()
+    await close_redis("celery")
+    await close_http_session()
+
 
 def wrap_dbs(func):
     @wraps(func)
     async def wrapped(*args, **kwargs):
         try:
-            await get_redis_client("celery")
-            await db.connect()
+            await _connect()
             res = await func(*args, **kwargs)
         finally:
-            await db.disconnect()
-            await close_redis("celery")
+            await _disconnect()
         return res
 
     return wrapped
+
+
+def start_worker_runtime():
+    global worker_loop
+    worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(worker_loop)
+    worker_loop.run_until_complete(_connect())
+
+
+def stop_worker_runtime():
+    global worker_loop
+    if worker_loop is None:
+        return
+    try:
+        worker_loop.run_until_complete(_disconnect())
+        worker_loop.run_until_complete(worker_loop.shutdown_asyncgens())
+    finally:
+        worker_loop.close()
+        worker_loop = None
+
+
+def run_in_worker(
+    func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any
+) -> Any:
+    """
+    Runs a coroutine function on the worker's event loop, reusing its
+    database, Redis and HTTP pools. Outside of an initialized worker
+    process (solo pool, scripts) it falls back to a one-off loop with
+    `wrap_dbs`.
+    """
+    if worker_loop is None or worker_loop.is_closed():
+        return asyncio.run(wrap_dbs(func)(*args, **kwargs))
+    return worker_loop.run_until_complete(func(*args, **kwargs))
@@ -165,6 +165,43 @@ class TroveManagerSnapshot(Base):
     )
 
 
+class TroveManagerDailyRollup(Base):
+    """
+    Trove manager snapshots aggregated per day, recomputed for the days
+    touched whenever new snapshots are ingested
+    """
+
+    __tablename__ = "trove_manager_daily_rollups"
+
+    bucket_size = 24 * 60 * 60
+
+    manager_id = Column(ForeignKey("trove_managers.id"), nullable=False)
+    bucket = Column(Numeric, nullable=False)
+    snapshots = Column(Integer)
+    last_timestamp = Column(Numeric)
+    last_index = Column(Integer)
+    last_collateral_price = Column(Numeric)
+    last_collateral_ratio = Column(Numeric)
+    max_collateral_ratio = Column(Numeric)
+    last_total_collateral_usd = Column(Numeric)
+    max_total_collateral_usd = Column(Numeric)
+    avg_total_collateral_usd = Column(Numeric)
+    last_total_debt = Column(Numeric)
+    max_total_debt = Column(Numeric)
+    avg_total_debt = Column(Numeric)
+    last_open_troves = Column(Integer)
+    max_open_troves = Column(Integer)
+
+    __table_args__ = (
+        Index(
+            "idx_trove_manager_daily_rollups__manager_id__bucket",
+            "manager_id",
+            "bucket",
+            unique=True,
+        ),
+    )
+
+
 class Trove(Base):
     __tablename__ = "troves"
 
@@ -241,6 +278,50 @@ class TroveSnapshot(Base):
     )
 
 
+class TroveState(Base):
+    """Latest known state of each trove, maintained at snapshot ingestion"""
+
+    __tablename__ = "trove_states"
+
+    trove_id = Column(ForeignKey("troves.id"), nullable=False)
+    manager_id = Column(ForeignKey("trove_managers.id"))
+    owner_id = Column(ForeignKey("users.id"))
+    status = Column(sa.Enum(Trove.TroveStatus))
+    collateral = Column(Numeric)
+    debt = Column(Numeric)
+    stake = Column(Numeric)
+    first_timestamp = Column(Numeric)
+    last_timestamp = Column(Numeric)
+    last_index = Column(Integer)
+
+    trove = relationship("Trove")
+
+    __table_args__ = (
+        Index(
+            "idx_trove_states__trove_id",
+            trove_id,
+            unique=True,
+        ),
+        Index(
+            "idx_trove_states__manager_id__status",
+            manager_id,
+            status,
+        ),
+        Index(
+            "idx_trove_states__manager_id__last_timestamp__trove_id",
+            manager_id,
+            last_timestamp,
+            trove_id,
+        ),
+        Index(
+            "idx_trove_states__owner_id_trgm",
+            owner_id,
+            postgresql_using="gin",
+            postgresql_ops={"owner_id": "gin_trgm_ops"},
+        ),
+    )
+
+
 class StabilityPool(Base):
     __tablename__ = "stability_pool"
 
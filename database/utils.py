@@ -37,6 +37,31 @@ def batch_insert_ignore(model: type[Base], data: list[dict]):
     return query
 
 
+def batch_upsert_query(
+    model: type[Base],
+    index_elements: list[str],
+    data: list[dict],
+    return_columns: list | None = None,
+):
+    """
+    Multi-row version of `upsert_query`. Rows must all share the same keys
+    and must be unique on `index_elements` as postgres refuses to update the
+    same row twice within a single ON CONFLICT statement.
+    """
+    insert_stmt = insert(model).values(data)
+    update_columns = {
+        key: insert_stmt.excluded[key]
+        for key in data[0].keys()
+        if key not in index_elements
+    }
+    query = insert_stmt.on_conflict_do_update(
+        index_elements=index_elements, set_=update_columns
+    )
+    if return_columns:
+        query = query.returning(*return_columns)
+    return query
+
+
 def update_by_id_query(model: type[Base], row_id: int, update_data: dict):
     query = (
         update(model.__table__)  # type: ignore
@@ -1,11 +1,39 @@
 import os
 
 from celery import Celery
-from celery.signals import worker_ready
+from celery.signals import (
+    worker_process_init,
+    worker_process_shutdown,
+    worker_ready,
+)
 
 from services.schedules import CELERY_BEAT_SCHEDULE
 from utils.const import CHAINS
 
+# workload classes, each consumed by its own worker (see docker-compose)
+SYNC_QUEUE = "sync"
+SIMULATION_QUEUE = "simulation"
+QUOTES_QUEUE = "quotes"
+BACKGROUND_QUEUE = "background"
+
+TASK_ROUTES = {
+    # I/O bound subgraph and on-chain syncs
+    "services.sync.*": {"queue": SYNC_QUEUE},
+    "services.cvxprisma.*": {"queue": SYNC_QUEUE},
+    "services.dao.*": {"queue": SYNC_QUEUE},
+    "services.prices.populate_mkusd.*": {"queue": SYNC_QUEUE},
+    # CPU bound Curve simulations
+    "services.prices.liquidity_depth.*": {"queue": SIMULATION_QUEUE},
+    # rate limited aggregator quotes
+    "services.prices.collateral.*": {"queue": QUOTES_QUEUE},
+    # slow external jobs with loose freshness requirements
+    "services.prices.mkusd_holders.*": {"queue": BACKGROUND_QUEUE},
+    "utils.labels.*": {"queue": BACKGROUND_QUEUE},
+}
+
+CHAIN_SYNC_PRIORITY = 0
+DEFAULT_PRIORITY = 5
+
 celery = Celery(
     "Prisma Monitor Jobs",
     backend=os.getenv("CELERY_RESULT_BACKEND"),
@@ -28,11 +56,56 @@ celery.conf.update(
     accept_content=["json"],
     result_serializer="json",
     beat_schedule=CELERY_BEAT_SCHEDULE,
+    task_default_queue=SYNC_QUEUE,
+    task_routes=TASK_ROUTES,
+    # lower values are served first, the chain sync jumps ahead of the
+    # other jobs waiting in its queue
+    task_default_priority=DEFAULT_PRIORITY,
+    task_annotations={
+        "services.sync.back_populate.back_populate_chain": {
+            "priority": CHAIN_SYNC_PRIORITY
+        }
+    },
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "queue_order_strategy": "priority",
+    },
+    # a busy process would otherwise hold prefetched tasks, whatever their
+    # priority, until its current job finishes
+    worker_prefetch_multiplier=1,
 )
 
 
+@worker_process_init.connect
+def start_async_runtime(**kwargs):
+    # each pool process keeps one event loop and its connection pools for
+    # all the tasks it runs
+    from database.engine import start_worker_runtime
+
+    start_worker_runtime()
+
+
+@worker_process_shutdown.connect
+def stop_async_runtime(**kwargs):
+    from database.engine import stop_worker_runtime
+
+    stop_worker_runtime()
+
+
+@worker_process_shutdown.connect
+def stop_simulation_pool(**kwargs):
+    from services.prices.liquidity_depth import close_simulation_pool
+
+    close_simulation_pool()
+
+
 @worker_ready.connect
 def run_task_on_startup(sender, **kwargs):
+    # every worker fires this, only the one serving the default queue
+    # schedules the startup jobs
+    queues = {queue.name for queue in sender.task_consumer.queues}
+    if SYNC_QUEUE not in queues:
+        return
     print("Worker is ready, executing startup tasks...")
     from services.prices.collateral import get_impact_data
     from services.prices.liquidity_depth import get_depth_data
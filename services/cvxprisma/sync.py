@@ -1,10 +1,9 @@
-import asyncio
 import logging
 import sys
 
 from sqlalchemy import select
 
-from database.engine import db, wrap_dbs
+from database.engine import db, run_in_worker
 from database.models.common import Chain
 from database.models.cvxprisma import CvxPrismaStaking, StakeEvent
 from database.utils import upsert_query
@@ -14,6 +13,9 @@ from services.cvxprisma.models import StakingData
 from services.cvxprisma.rewards import update_payouts
 from services.cvxprisma.snapshots import update_snapshots
 from services.cvxprisma.staking import update_staking
+from services.messaging.invalidation import Dataset
+from services.messaging.pubsub import publish_dataset_changed
+from services.task_lock import task_lock
 from utils.const.chains import ethereum
 
 logger = logging.getLogger()
@@ -30,7 +32,7 @@ logger.addHandler(handler)
 
 @celery.task
 def back_populate_cvxprisma(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(sync_cvx_prisma_from_subgraph)(chain, chain_id))
+    run_in_worker(sync_cvx_prisma_from_subgraph, chain, chain_id)
 
 
 async def get_staking_data(chain_id: int) -> list[StakingData]:
@@ -58,6 +60,7 @@ async def get_staking_data(chain_id: int) -> list[StakingData]:
     return []
 
 
+@task_lock()
 async def sync_cvx_prisma_from_subgraph(
     chain: str = ethereum.CHAIN_NAME, chain_id: int = ethereum.CHAIN_ID
 ):
@@ -123,3 +126,4 @@ async def sync_cvx_prisma_from_subgraph(
                 previous_data.snapshot_count if previous_data else 0,
                 new_data.snapshot_count,
             )
+    await publish_dataset_changed(Dataset.cvxprisma, chain_id)
@@ -12,9 +12,10 @@ from database.models.dao import (
     WeeklyEmissions,
 )
 from database.utils import add_user, upsert_query
+from services.task_lock import task_lock
 from utils.const import SUBGRAPHS
 from utils.const.chains import ethereum
-from utils.subgraph.query import async_grt_query
+from utils.subgraph.query import async_grt_query, prefetch_keyset_pages
 from utils.time import get_week
 
 logger = logging.getLogger()
@@ -40,7 +41,7 @@ async def get_latest_db_week(chain_id):
 
 WEEKLY_BOOST_DATA_QUERY = """
 {
-  weeklyBoostDatas(first:1000 skip: %d orderBy:index orderDirection: desc where:{week: %d}) {
+  weeklyBoostDatas(first:1000 orderBy:index orderDirection: asc where:{week: %d index_gt: %d}) {
     index
     account {
       id
@@ -152,7 +153,6 @@ async def add_claim_data(
 ):
     while True:
         for claim_data in data_batch["batchRewardClaims"]:
-
             await add_user(claim_data["caller"]["id"])
             await add_user(claim_data["receiver"]["id"])
             await add_user(claim_data["boostDelegate"]["id"])
@@ -195,49 +195,53 @@ async def add_claim_data(
 
 
 async def sync_weekly_boost_data(chain: str, chain_id: int, week: int):
-    for i in range(0, 6000, 1000):
-        logger.info(f"Syncing weekly boost data for week {week}")
-        query = WEEKLY_BOOST_DATA_QUERY % (i, week)
-        boost_data = await async_grt_query(
-            endpoint=SUBGRAPHS[chain], query=query
-        )
-        if not boost_data:
-            logger.info(f"No boost data found for week {week}")
-            return
+    logger.info(f"Syncing weekly boost data for week {week}")
+    async with prefetch_keyset_pages(
+        SUBGRAPHS[chain],
+        lambda cursor: WEEKLY_BOOST_DATA_QUERY % (week, int(cursor)),
+        entity="weeklyBoostDatas",
+        cursor_field="index",
+        start=-1,
+    ) as pages:
+        async for query, boost_data in pages:
+            if not boost_data:
+                logger.info(f"No boost data found for week {week}")
+                return
 
-        for boost in boost_data["weeklyBoostDatas"]:
-            await add_user(boost["account"]["id"])
-            indexes = {
-                "chain_id": chain_id,
-                "user_id": boost["account"]["id"],
-                "week": boost["week"],
-            }
-            data = {
-                "boost": boost["boost"],
-                "pct": boost["pct"],
-                "last_applied_fee": boost["lastAppliedFee"],
-                "non_locking_fee": boost["nonLockingFee"],
-                "boost_delegation": boost["boostDelegation"],
-                "boost_delegation_users": boost["boostDelegationUsers"],
-                "eligible_for": boost["eligibleFor"],
-                "total_claimed": boost["totalClaimed"],
-                "self_claimed": boost["selfClaimed"],
-                "other_claimed": boost["otherClaimed"],
-                "accrued_fees": boost["accruedFees"],
-                "time_to_depletion": boost["timeToDepletion"],
-            }
-            query = upsert_query(WeeklyBoostData, indexes, data)
-            await db.execute(query)
-            await add_claim_data(
-                chain,
-                chain_id,
-                week,
-                boost["account"]["id"],
-                boost["boostDelegationUsers"],
-                boost,
-            )
+            for boost in boost_data["weeklyBoostDatas"]:
+                await add_user(boost["account"]["id"])
+                indexes = {
+                    "chain_id": chain_id,
+                    "user_id": boost["account"]["id"],
+                    "week": boost["week"],
+                }
+                data = {
+                    "boost": boost["boost"],
+                    "pct": boost["pct"],
+                    "last_applied_fee": boost["lastAppliedFee"],
+                    "non_locking_fee": boost["nonLockingFee"],
+                    "boost_delegation": boost["boostDelegation"],
+                    "boost_delegation_users": boost["boostDelegationUsers"],
+                    "eligible_for": boost["eligibleFor"],
+                    "total_claimed": boost["totalClaimed"],
+                    "self_claimed": boost["selfClaimed"],
+                    "other_claimed": boost["otherClaimed"],
+                    "accrued_fees": boost["accruedFees"],
+                    "time_to_depletion": boost["timeToDepletion"],
+                }
+                query = upsert_query(WeeklyBoostData, indexes, data)
+                await db.execute(query)
+                await add_claim_data(
+                    chain,
+                    chain_id,
+                    week,
+                    boost["account"]["id"],
+                    boost["boostDelegationUsers"],
+                    boost,
+                )
 
 
+@task_lock()
 async def sync_boost_data(
     chain: str = ethereum.CHAIN_NAME, chain_id: int = ethereum.CHAIN_ID
 ):
@@ -12,9 +12,10 @@ from database.models.dao import (
     UserWeeklyIncentivePoints,
 )
 from database.utils import add_user, upsert_query
+from services.task_lock import task_lock
 from utils.const import SUBGRAPHS
 from utils.const.chains import ethereum
-from utils.subgraph.query import async_grt_query
+from utils.subgraph.query import prefetch_keyset_pages
 from utils.time import get_week
 
 logger = logging.getLogger()
@@ -236,6 +237,7 @@ async def parse_incentive_data(
     return last_index
 
 
+@task_lock()
 async def sync_incentive_votes(
     chain: str = ethereum.CHAIN_NAME, chain_id: int = ethereum.CHAIN_ID
 ):
@@ -247,26 +249,25 @@ async def sync_incentive_votes(
         f"## incentive current w {current_week}, latest {latest_week}"
     )
     for week in range(latest_week, current_week + 1):
-        for index in range(0, 10000, 1000):
-            logger.info(
-                f"Syncing incentive votes for week {week} with index {index}"
-            )
-            query = INCENTIVE_VOTING_QUERY % (week, index)
-            incentive_data = await async_grt_query(
-                endpoint=endpoint, query=query
-            )
-            if not incentive_data:
-                raise Exception(
-                    f"Did not receive any data from the graph on chain {chain} when query for incentives {query}"
+        logger.info(f"Syncing incentive votes for week {week}")
+        async with prefetch_keyset_pages(
+            endpoint,
+            lambda cursor: INCENTIVE_VOTING_QUERY % (week, int(cursor)),
+            entity="incentiveVotes",
+            cursor_field="weeklyVoteIndex",
+            start=0,
+        ) as pages:
+            async for query, incentive_data in pages:
+                if not incentive_data:
+                    raise Exception(
+                        f"Did not receive any data from the graph on chain {chain} when query for incentives {query}"
+                    )
+                last_processed_index = await parse_incentive_data(
+                    chain_id, week, incentive_data
+                )
+                logger.info(
+                    f"Total entries process in this batch {last_processed_index} : {len(incentive_data['incentiveVotes'])}"
                 )
-            last_processed_index = await parse_incentive_data(
-                chain_id, week, incentive_data
-            )
-            logger.info(
-                f"Total entries process in this batch {last_processed_index} : {len(incentive_data['incentiveVotes'])}"
-            )
-            if last_processed_index < index + 1000:
-                break
 
 
 if __name__ == "__main__":
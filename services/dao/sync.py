@@ -1,8 +1,7 @@
-import asyncio
 import logging
 import sys
 
-from database.engine import wrap_dbs
+from database.engine import run_in_worker
 from services.celery import celery
 from services.dao.boost import sync_boost_data
 from services.dao.incentives import sync_incentive_votes
@@ -22,19 +21,19 @@ logger.addHandler(handler)
 
 @celery.task
 def back_populate_ownership_votes(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(sync_ownership_proposals_and_votes)(chain, chain_id))
+    run_in_worker(sync_ownership_proposals_and_votes, chain, chain_id)
 
 
 @celery.task
 def back_populate_incentive_votes(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(sync_incentive_votes)(chain, chain_id))
+    run_in_worker(sync_incentive_votes, chain, chain_id)
 
 
 @celery.task
 def back_populate_boost_data(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(sync_boost_data)(chain, chain_id))
+    run_in_worker(sync_boost_data, chain, chain_id)
 
 
 @celery.task
 def back_populate_weight_data(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(sync_weight_data)(chain, chain_id))
+    run_in_worker(sync_weight_data, chain, chain_id)
@@ -5,9 +5,10 @@ from database.engine import db, wrap_dbs
 from database.models.common import Chain
 from database.models.dao import TotalWeeklyWeight, UserWeeklyWeights
 from database.utils import upsert_query, upsert_user
+from services.task_lock import task_lock
 from utils.const import SUBGRAPHS
 from utils.const.chains import ethereum
-from utils.subgraph.query import async_grt_query
+from utils.subgraph.query import async_grt_query, prefetch_pages
 
 logger = logging.getLogger()
 
@@ -65,41 +66,45 @@ async def sync_total_weights(chain: str, chain_id: int) -> int:
 async def sync_account_weight_data(
     chain: str, chain_id: int, total_accounts: int
 ):
-    for i in range(0, total_accounts, 500):
-        logging.info(f"Syncing account weight data for accounts {i} - {i+500}")
-        query = WEEKLY_ACCOUNT_WEIGHTS_QUERY % i
-        accounts_weight_data = await async_grt_query(
-            endpoint=SUBGRAPHS[chain], query=query
-        )
-        if not accounts_weight_data:
-            logging.warning(f"No account weight data found")
-            return
-        for account in accounts_weight_data["accountDatas"]:
-            await upsert_user(
-                account["id"],
-                {
-                    "latest_fee": account["feePct"],
-                    "frozen_balance": account["frozen"],
-                    "weight": account["weight"],
-                    "delegating": account["boostEnabled"],
-                },
-            )
-            for j, weight in enumerate(account["accountWeeklyWeights"]):
-                if weight == "0" and account["accountWeeklyUnlocks"][j] == "0":
-                    continue
-                indexes = {
-                    "chain_id": chain_id,
-                    "user_id": account["id"],
-                    "week": j,
-                }
-                data = {
-                    "weight": weight,
-                    "unlock": account["accountWeeklyUnlocks"][j],
-                }
-                query = upsert_query(UserWeeklyWeights, indexes, data)
-                await db.execute(query)
+    logging.info(f"Syncing account weight data for {total_accounts} accounts")
+    queries = (
+        WEEKLY_ACCOUNT_WEIGHTS_QUERY % i for i in range(0, total_accounts, 500)
+    )
+    async with prefetch_pages(SUBGRAPHS[chain], queries) as pages:
+        async for query, accounts_weight_data in pages:
+            if not accounts_weight_data:
+                logging.warning(f"No account weight data found")
+                return
+            for account in accounts_weight_data["accountDatas"]:
+                await upsert_user(
+                    account["id"],
+                    {
+                        "latest_fee": account["feePct"],
+                        "frozen_balance": account["frozen"],
+                        "weight": account["weight"],
+                        "delegating": account["boostEnabled"],
+                    },
+                )
+                for j, weight in enumerate(account["accountWeeklyWeights"]):
+                    if (
+                        weight == "0"
+                        and account["accountWeeklyUnlocks"][j] == "0"
+                    ):
+                        continue
+                    indexes = {
+                        "chain_id": chain_id,
+                        "user_id": account["id"],
+                        "week": j,
+                    }
+                    data = {
+                        "weight": weight,
+                        "unlock": account["accountWeeklyUnlocks"][j],
+                    }
+                    query = upsert_query(UserWeeklyWeights, indexes, data)
+                    await db.execute(query)
 
 
+@task_lock()
 async def sync_weight_data(
     chain: str = ethereum.CHAIN_NAME, chain_id: int = ethereum.CHAIN_ID
 ):
@@ -1,6 +1,8 @@
 import json
+import logging
 
 from api.routes.v1.websocket.handler import Handler
+from api.routes.v1.websocket.invalidation import dataset_changed_callback
 from api.routes.v1.websocket.stability_pool.callback import (
     stability_pool_callback,
 )
@@ -17,14 +19,19 @@ from api.routes.v1.websocket.troves_overview.callback import (
 from api.routes.v1.websocket.troves_overview.models import (
     TroveOverviewSettings,
 )
+from services.messaging.invalidation import DatasetChangedPayload
+
+logger = logging.getLogger()
 
 TROVE_OVERVIEW_UPDATE = "trove_overview_update"
 STABILITY_POOL_UPDATE = "stability_pool_update"
 TROVE_OPERATIONS_UPDATE = "trove_operations_update"
+CACHE_INVALIDATION = "cache_invalidation"
 REDIS_MESSAGING_CHANNELS = [
     TROVE_OVERVIEW_UPDATE,
     STABILITY_POOL_UPDATE,
     TROVE_OPERATIONS_UPDATE,
+    CACHE_INVALIDATION,
 ]
 
 CALLBACK_MAPPING = {
@@ -37,12 +44,62 @@ CALLBACK_MAPPING = {
     TROVE_OPERATIONS_UPDATE: Handler(
         trove_operations_callback, TroveOperationsPayload
     ),
+    CACHE_INVALIDATION: Handler(
+        dataset_changed_callback, DatasetChangedPayload
+    ),
 }
 
 
+def _merge_payloads(messages: list[dict]) -> list[dict]:
+    # updates for the same subscription are sent as a single payload
+    merged: dict[str, dict] = {}
+    for message in messages:
+        key = json.dumps(message.get("subscription"), sort_keys=True)
+        if key in merged:
+            merged[key]["payload"] += message["payload"]
+        else:
+            merged[key] = message
+    return list(merged.values())
+
+
+def _unique_datasets(messages: list[dict]) -> list[dict]:
+    unique: dict[tuple, dict] = {}
+    for message in messages:
+        unique.setdefault((message["dataset"], message["chain_id"]), message)
+    return list(unique.values())
+
+
+def coalesce_messages(channel: str, data: list[str]) -> list[str]:
+    """
+    Collapses a burst of messages received on a channel into the minimal
+    set that still delivers every update.
+    """
+    if channel == TROVE_OVERVIEW_UPDATE:
+        # overview updates only carry the chain to refresh
+        return list(dict.fromkeys(data))
+    if channel in (STABILITY_POOL_UPDATE, TROVE_OPERATIONS_UPDATE):
+        messages = _merge_payloads([json.loads(item) for item in data])
+    elif channel == CACHE_INVALIDATION:
+        messages = _unique_datasets([json.loads(item) for item in data])
+    else:
+        return data
+    return [json.dumps(message) for message in messages]
+
+
 async def parse_incoming_messages(channel: str, data: str):
     json_data = json.loads(data)
     if channel in CALLBACK_MAPPING:
         await CALLBACK_MAPPING[channel].func(
             CALLBACK_MAPPING[channel].model.parse_obj(json_data)
         )
+
+
+async def dispatch_messages(batch: dict[str, list[str]]):
+    for channel, data in batch.items():
+        for message_content in coalesce_messages(channel, data):
+            try:
+                await parse_incoming_messages(
+                    channel=channel, data=message_content
+                )
+            except Exception as e:
+                logger.error(f"Error handling message on {channel}: {e}")
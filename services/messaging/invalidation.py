@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+
+from pydantic import BaseModel
+
+from services.messaging.redis import get_redis_client
+from utils.cache import invalidate, warm
+
+logger = logging.getLogger()
+
+# an event's entries are evicted by the first API worker claiming it
+EVENT_CLAIM_TTL = 60
+# how long the other workers wait for the eviction before warming anyway
+EVENT_WAIT_TIMEOUT = 10
+EVENT_POLL_INTERVAL = 0.05
+EVENT_PENDING = "pending"
+EVENT_DONE = "done"
+
+# warm-ups in progress, referenced so they aren't garbage collected
+warm_tasks: set[asyncio.Task] = set()
+
+
+class Dataset(str, Enum):
+    troves = "troves"
+    manager_snapshots = "manager_snapshots"
+    stability_pool = "stability_pool"
+    collateral_prices = "collateral_prices"
+    revenue = "revenue"
+    cvxprisma = "cvxprisma"
+
+
+# REST cache namespaces built from each dataset
+DATASET_NAMESPACES: dict[Dataset, list[str]] = {
+    Dataset.troves: ["trove", "trove_managers"],
+    Dataset.manager_snapshots: ["trove_managers", "mkusd"],
+    Dataset.stability_pool: ["stability_pool"],
+    Dataset.collateral_prices: ["collateral", "trove_managers"],
+    Dataset.revenue: ["revenue"],
+    Dataset.cvxprisma: ["staking"],
+}
+
+
+class DatasetChangedPayload(BaseModel):
+    dataset: Dataset
+    chain_id: int
+    event_id: str
+
+
+def _event_key(payload: DatasetChangedPayload) -> str:
+    return f"cache_event:{payload.event_id}"
+
+
+async def _claim_event(payload: DatasetChangedPayload) -> bool:
+    redis_client = await get_redis_client("fastapi")
+    return bool(
+        await redis_client.set(
+            _event_key(payload),
+            EVENT_PENDING,
+            nx=True,
+            ex=EVENT_CLAIM_TTL,
+        )
+    )
+
+
+async def _complete_event(payload: DatasetChangedPayload):
+    redis_client = await get_redis_client("fastapi")
+    await redis_client.set(_event_key(payload), EVENT_DONE, ex=EVENT_CLAIM_TTL)
+
+
+async def _wait_for_eviction(payload: DatasetChangedPayload):
+    redis_client = await get_redis_client("fastapi")
+    deadline = time.monotonic() + EVENT_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        if await redis_client.get(_event_key(payload)) == EVENT_DONE:
+            return
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+    logger.warning(f"Timed out waiting for cache event {payload.event_id}")
+
+
+async def _warm_dataset(payload: DatasetChangedPayload, claimed: bool):
+    """
+    Recomputes the entries this worker recently served for the changed
+    dataset, once the claiming worker has evicted them. Each worker warms
+    its own recent requests; the compute lease makes sure an entry shared
+    by several workers is still only computed once.
+    """
+    if not claimed:
+        await _wait_for_eviction(payload)
+    for namespace in DATASET_NAMESPACES[payload.dataset]:
+        await warm(namespace, payload.chain_id)
+
+
+def _on_warm_done(task: asyncio.Task):
+    warm_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Cache warm-up failed: {task.exception()}")
+
+
+async def cache_invalidation_callback(payload: DatasetChangedPayload):
+    claimed = await _claim_event(payload)
+    if claimed:
+        for namespace in DATASET_NAMESPACES[payload.dataset]:
+            removed = await invalidate(namespace, payload.chain_id)
+            logger.info(
+                f"{payload.dataset.value} changed on chain {payload.chain_id}, evicted {removed} entries from {namespace}"
+            )
+        await _complete_event(payload)
+    # recomputing can take a while, keep the listener responsive
+    task = asyncio.create_task(_warm_dataset(payload, claimed))
+    warm_tasks.add(task)
+    task.add_done_callback(_on_warm_done)
@@ -1,16 +1,31 @@
 import asyncio
 import logging
+import time
+import uuid
+from collections import defaultdict
 
 import aioredis
 
 from services.messaging.handler import (
+    CACHE_INVALIDATION,
     REDIS_MESSAGING_CHANNELS,
-    parse_incoming_messages,
+    dispatch_messages,
 )
+from services.messaging.invalidation import Dataset, DatasetChangedPayload
 from services.messaging.redis import get_redis_client
+from services.messaging.streams import (
+    add_to_stream,
+    listen_for_stream_notifications,
+)
+from settings.config import settings
 
 logger = logging.getLogger()
 
+# how long the listener blocks waiting for a message before checking back
+LISTEN_TIMEOUT = 30
+# messages received this long after the first of a burst are sent together
+COALESCE_WINDOW = 0.05
+
 
 async def publish_message(
     channel: str, data: str, retries: int = 3, delay: int = 5
@@ -18,14 +33,64 @@ async def publish_message(
     for _ in range(retries):
         try:
             redis_client = await get_redis_client("celery")
-            await redis_client.publish(channel, data)
+            if settings.REDIS_MESSAGING_BACKEND == "streams":
+                await add_to_stream(redis_client, channel, data)
+            else:
+                await redis_client.publish(channel, data)
             return
         except aioredis.ConnectionError:
             await asyncio.sleep(delay)
     raise Exception("Failed to publish after multiple retries.")
 
 
+async def publish_dataset_changed(dataset: Dataset, chain_id: int):
+    """
+    Notifies the API that a synced dataset changed so that the caches built
+    from it are evicted and recomputed.
+    """
+    payload = DatasetChangedPayload(
+        dataset=dataset, chain_id=chain_id, event_id=uuid.uuid4().hex
+    )
+    try:
+        await publish_message(CACHE_INVALIDATION, payload.json())
+    except Exception as e:
+        # caches still expire on their ttl, a lost event is not fatal
+        logger.error(f"Could not publish {dataset.value} change event: {e}")
+
+
+def _decode(value: str | bytes) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+async def _read_batch(pubsub) -> dict[str, list[str]]:
+    """
+    Blocks until a message arrives, then keeps collecting messages for
+    the coalescing window and returns them grouped by channel.
+    """
+    batch: dict[str, list[str]] = defaultdict(list)
+    timeout: float = LISTEN_TIMEOUT
+    deadline = None
+    while True:
+        message = await pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout
+        )
+        if message and message["type"] == "message":
+            batch[_decode(message["channel"])].append(_decode(message["data"]))
+            if deadline is None:
+                deadline = time.monotonic() + COALESCE_WINDOW
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return batch
+        elif message is None:
+            # idle, let the caller check on the connection
+            return batch
+
+
 async def listen_for_redis_notifications():
+    if settings.REDIS_MESSAGING_BACKEND == "streams":
+        await listen_for_stream_notifications()
+        return
     while True:
         try:
             redis_client = await get_redis_client("fastapi")
@@ -36,25 +101,9 @@ async def listen_for_redis_notifications():
                 await pubsub.subscribe(channel)
 
             while True:
-                message = await pubsub.get_message(
-                    ignore_subscribe_messages=True
-                )
-                if message and message["type"] == "message":
-
-                    message_content = (
-                        message["data"].decode("utf-8")
-                        if isinstance(message["data"], bytes)
-                        else message["data"]
-                    )
-                    channel_name = (
-                        message["channel"].decode("utf-8")
-                        if isinstance(message["channel"], bytes)
-                        else message["channel"]
-                    )
-
-                    await parse_incoming_messages(
-                        channel=channel_name, data=message_content
-                    )
+                batch = await _read_batch(pubsub)
+                if batch:
+                    await dispatch_messages(batch)
         except aioredis.ConnectionError as e:
             logger.error(f"Connection error for redis messaging {e}")
             await asyncio.sleep(5)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import traceback
+from collections import defaultdict
+
+import aioredis
+
+from services.messaging.handler import (
+    REDIS_MESSAGING_CHANNELS,
+    dispatch_messages,
+)
+from services.messaging.redis import get_redis_client
+from settings.config import settings
+
+logger = logging.getLogger()
+
+# entries kept per stream, trimmed approximately on every write
+STREAM_MAX_LENGTH = 10_000
+STREAM_READ_COUNT = 500
+# how long a read blocks waiting for entries, must stay below the lease ttl
+STREAM_BLOCK_MS = 30_000
+# API processes on a host reuse consumer groups through numbered slots so a
+# restarted worker resumes where its predecessor stopped
+MAX_CONSUMER_SLOTS = 64
+CONSUMER_LEASE_TTL = 90
+# delay before restarting the listener after a failure, doubled on each
+# consecutive failure
+LISTEN_RETRY_DELAY = 5
+LISTEN_MAX_RETRY_DELAY = 60
+
+
+def stream_key(channel: str) -> str:
+    return f"stream:{channel}"
+
+
+async def add_to_stream(redis_client: aioredis.Redis, channel: str, data: str):
+    await redis_client.xadd(
+        stream_key(channel),
+        {"data": data},
+        maxlen=STREAM_MAX_LENGTH,
+        approximate=True,
+    )
+
+
+class ConsumerLease:
+    def __init__(self, redis_client: aioredis.Redis):
+        self.redis_client = redis_client
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.key: str | None = None
+        self.group: str | None = None
+
+    async def acquire(self) -> str:
+        # keep the same group when reconnecting if the lease survived
+        if (
+            self.key is not None
+            and self.group is not None
+            and await self.redis_client.get(self.key) == self.owner
+        ):
+            return self.group
+        host = socket.gethostname()
+        while True:
+            for slot in range(MAX_CONSUMER_SLOTS):
+                key = f"messaging:consumer:{host}:{slot}"
+                if await self.redis_client.set(
+                    key, self.owner, nx=True, ex=CONSUMER_LEASE_TTL
+                ):
+                    self.key = key
+                    self.group = f"api-{host}-{slot}"
+                    return self.group
+            logger.warning("No free messaging consumer slot, retrying")
+            await asyncio.sleep(CONSUMER_LEASE_TTL)
+
+    async def renew(self):
+        if await self.redis_client.get(self.key) != self.owner:
+            raise aioredis.ConnectionError(
+                f"Lost messaging consumer lease {self.key}"
+            )
+        await self.redis_client.expire(self.key, CONSUMER_LEASE_TTL)
+
+
+async def _prepare_group(redis_client: aioredis.Redis, group: str):
+    """
+    Creates the consumer group on every stream. A group that was left
+    behind for longer than the live update horizon skips ahead so that
+    reclaiming it doesn't replay stale history to clients.
+    """
+    horizon_id = (
+        f"{int((time.time() - settings.LIVE_UPDATE_HORIZON) * 1000)}-0"
+    )
+    for channel in REDIS_MESSAGING_CHANNELS:
+        stream = stream_key(channel)
+        try:
+            await redis_client.xgroup_create(
+                stream, group, id="$", mkstream=True
+            )
+            continue
+        except aioredis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        for info in await redis_client.xinfo_groups(stream):
+            if info["name"] == group and _id_before(
+                info["last-delivered-id"], horizon_id
+            ):
+                await redis_client.xgroup_setid(stream, group, horizon_id)
+
+
+def _id_before(entry_id: str, other_id: str) -> bool:
+    def parse(value: str) -> tuple[int, int]:
+        ms, _, seq = value.partition("-")
+        return int(ms), int(seq or 0)
+
+    return parse(entry_id) < parse(other_id)
+
+
+async def _read_and_dispatch(
+    redis_client: aioredis.Redis, group: str, entry_id: str
+) -> int:
+    """
+    Reads one batch for the group, dispatches it grouped by channel and
+    acknowledges it. `entry_id` is ">" for new entries or "0" to replay
+    entries delivered before a crash but never acknowledged.
+    """
+    response = await redis_client.xreadgroup(
+        group,
+        group,
+        {
+            stream_key(channel): entry_id
+            for channel in REDIS_MESSAGING_CHANNELS
+        },
+        count=STREAM_READ_COUNT,
+        block=STREAM_BLOCK_MS if entry_id == ">" else None,
+    )
+    batch: dict[str, list[str]] = defaultdict(list)
+    entry_ids: dict[str, list[str]] = defaultdict(list)
+    for stream, entries in response or []:
+        channel = stream.removeprefix("stream:")
+        for message_id, fields in entries:
+            entry_ids[stream].append(message_id)
+            # pending entries trimmed from the stream come back without
+            # fields, they are acknowledged so they aren't replayed again
+            if not fields:
+                logger.warning(f"Skipping trimmed entry {message_id}")
+                continue
+            batch[channel].append(fields["data"])
+    if batch:
+        await dispatch_messages(batch)
+    for stream, ids in entry_ids.items():
+        await redis_client.xack(stream, group, *ids)
+    return sum(len(ids) for ids in entry_ids.values())
+
+
+async def listen_for_stream_notifications():
+    lease = None
+    retry_delay = LISTEN_RETRY_DELAY
+    while True:
+        try:
+            redis_client = await get_redis_client("fastapi")
+            if lease is None:
+                lease = ConsumerLease(redis_client)
+            lease.redis_client = redis_client
+            group = await lease.acquire()
+            await _prepare_group(redis_client, group)
+            logger.info(f"Reading messaging streams as {group}")
+
+            while await _read_and_dispatch(redis_client, group, "0"):
+                pass
+            while True:
+                await _read_and_dispatch(redis_client, group, ">")
+                await lease.renew()
+                retry_delay = LISTEN_RETRY_DELAY
+        except aioredis.ConnectionError as e:
+            logger.error(f"Connection error for redis messaging {e}")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, LISTEN_MAX_RETRY_DELAY)
+        except Exception as e:
+            # anything else would silently stop live updates for good
+            logger.error(
+                f"Redis messaging listener failed: {e}\n{traceback.format_exc()}"
+            )
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, LISTEN_MAX_RETRY_DELAY)
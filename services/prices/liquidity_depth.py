@@ -1,15 +1,22 @@
 import asyncio
 import json
 import logging
+import time
+from functools import partial
+from typing import Any, Callable
 
+import billiard
 import numpy as np
 from pydantic import BaseModel
 from web3 import Web3
 from web3mc import Multicall
 
+from database.engine import run_in_worker
 from services.celery import celery
 from services.messaging.redis import get_redis_client
+from services.task_lock import task_lock
 from utils.const import CURVE_SUBGRAPHS, PROVIDERS, STABLECOINS
+from utils.sims.curve.impact import max_amount_within_impact
 from utils.sims.curve.metapool import CurveMetaPool
 from utils.sims.curve.pool import CurvePool
 from utils.subgraph.query import async_grt_query
@@ -38,7 +45,8 @@ GRAPH_QUERY = """
 
 GRAPH_BASEPOOL_QUERY = """
 {
-  pools(where:{id:"%s" assetType: 0}) {
+  pools(where:{id_in:%s assetType: 0}) {
+    id
     address
     name
     coinDecimals
@@ -65,11 +73,26 @@ BALANCES_ABI = [
 ]
 
 DEPTH_SLUG = "liquidity_depth"
+# price moves for which the exact trade size is solved for
+DEPTH_IMPACTS = [0.01, 0.02, 0.05]
+DEPTH_LEVELS = 100
+# base pool parameters rarely change, they are refreshed at most this often
+BASE_POOL_INFO_TTL = 60 * 60
+SIMULATION_PROCESSES = 2
+
+base_pool_info: dict[tuple[str, str], tuple[float, "PoolDetails"]] = {}
+simulation_pool: Any = None
+
+
+class ImpactThreshold(BaseModel):
+    impact: float
+    amount: float
 
 
 class PoolSales(BaseModel):
     amounts: list[float]
     prices: list[float]
+    thresholds: list[ImpactThreshold] = []
 
 
 class PoolDepth(BaseModel):
@@ -93,25 +116,47 @@ class PoolDetails(BaseModel):
     balances: list[int] | None
 
 
-async def _get_base_pool_info(chain: str, address: str) -> PoolDetails | None:
-    query = GRAPH_BASEPOOL_QUERY % address
-    data = await async_grt_query(CURVE_SUBGRAPHS[chain], query)
-    if data is None:
-        logger.error("No base pool data for {} on {}", [address, chain])
-        return None
-    pool = data["pools"][0]
-    snapshot = pool["dailyPoolSnapshots"][0]
-    return PoolDetails(
-        address=pool["address"],
-        name=pool["name"],
-        coin_names=pool["coinNames"],
-        mkusd_index=-1,
-        decimals=pool["coinDecimals"],
-        metapool=False,
-        basepool=None,
-        A=snapshot["A"],
-        fee=int(float(snapshot["fee"]) * 1e10),
-    )
+async def _get_base_pools_info(
+    chain: str, addresses: set[str]
+) -> dict[str, PoolDetails]:
+    """
+    Returns the details of the given base pools, fetching the ones missing
+    from the cache in a single query.
+    """
+    now = time.time()
+    missing = [
+        address
+        for address in addresses
+        if (chain, address) not in base_pool_info
+        or now - base_pool_info[(chain, address)][0] > BASE_POOL_INFO_TTL
+    ]
+    if missing:
+        query = GRAPH_BASEPOOL_QUERY % json.dumps(sorted(missing))
+        data = await async_grt_query(CURVE_SUBGRAPHS[chain], query)
+        if data is None:
+            logger.error(f"No base pool data for {missing} on {chain}")
+        else:
+            for pool in data["pools"]:
+                snapshot = pool["dailyPoolSnapshots"][0]
+                base_pool_info[(chain, pool["id"])] = (
+                    now,
+                    PoolDetails(
+                        address=pool["address"],
+                        name=pool["name"],
+                        coin_names=pool["coinNames"],
+                        mkusd_index=-1,
+                        decimals=pool["coinDecimals"],
+                        metapool=False,
+                        basepool=None,
+                        A=snapshot["A"],
+                        fee=int(float(snapshot["fee"]) * 1e10),
+                    ),
+                )
+    return {
+        address: base_pool_info[(chain, address)][1].copy()
+        for address in addresses
+        if (chain, address) in base_pool_info
+    }
 
 
 async def _get_all_relevant_pools(chain: str) -> list[PoolDetails]:
@@ -144,23 +189,91 @@ async def _get_all_relevant_pools(chain: str) -> list[PoolDetails]:
 
 
 async def get_pool_balances(
-    chain: str, pool_details: PoolDetails
-) -> list[int]:
+    chain: str, pools: list[PoolDetails]
+) -> list[list[int]]:
+    """
+    Reads the balances of every given pool in a single multicall.
+    """
     w3 = PROVIDERS[chain]
-    contract = Web3(w3).eth.contract(
-        Web3.to_checksum_address(pool_details.address), abi=BALANCES_ABI
-    )
     multicall = Multicall(provider_url=w3.endpoint_uri, max_retries=1)
-    calls = [
-        contract.functions.balances(i)
-        for i in range(len(pool_details.decimals))
-    ]
+    calls = []
+    for pool_details in pools:
+        contract = Web3(w3).eth.contract(
+            Web3.to_checksum_address(pool_details.address), abi=BALANCES_ABI
+        )
+        calls += [
+            contract.functions.balances(i)
+            for i in range(len(pool_details.decimals))
+        ]
     bals = await multicall.async_aggregate(calls, use_try=True)
-    normalized_balances = [
-        bal * (10 ** (18 - pool_details.decimals[i]))
-        for i, bal in enumerate(bals)
-    ]
-    return normalized_balances
+
+    balances = []
+    offset = 0
+    for pool_details in pools:
+        n_coins = len(pool_details.decimals)
+        balances.append(
+            [
+                bal * (10 ** (18 - pool_details.decimals[i]))
+                for i, bal in enumerate(bals[offset : offset + n_coins])
+            ]
+        )
+        offset += n_coins
+    return balances
+
+
+def _depth_levels(max_amount: int) -> list[int]:
+    # geometric spacing puts most points near the peg where prices move
+    # the most relative to trade size. Balances overflow int64, numpy
+    # only spaces them as floats
+    upper = float(max(max_amount, 2 * 10**18))
+    return [int(level) for level in np.geomspace(1e18, upper, DEPTH_LEVELS)]
+
+
+def _impact_thresholds(
+    levels: list[int], received: list[int], get_dy: Callable[[int], int]
+) -> list[ImpactThreshold]:
+    """
+    Solves the trade size for each of `DEPTH_IMPACTS`, using the sweep to
+    bracket the answer so only a few exact evaluations are needed.
+    """
+    rates = [dy / level for level, dy in zip(levels, received)]
+    thresholds = []
+    for impact in DEPTH_IMPACTS:
+        min_rate = rates[0] / (1 + impact)
+        crossing = next(
+            (k for k, rate in enumerate(rates) if rate < min_rate), None
+        )
+        if crossing is None:
+            amount = levels[-1]
+        else:
+            amount = max_amount_within_impact(
+                get_dy,
+                impact,
+                max_amount=levels[-1],
+                reference_amount=levels[0],
+                bracket=(levels[max(crossing - 1, 0)], levels[crossing]),
+            )
+        thresholds.append(
+            ImpactThreshold(impact=impact, amount=amount * 1e-18)
+        )
+    return thresholds
+
+
+def _sales_from_sweep(
+    levels: list[int],
+    received: list[int],
+    buy: bool,
+    get_dy: Callable[[int], int],
+) -> PoolSales:
+    depth = PoolSales(
+        prices=[],
+        amounts=[],
+        thresholds=_impact_thresholds(levels, received, get_dy),
+    )
+    for level, dy in zip(levels, received):
+        depth.prices.append(level / dy if buy else dy / level)
+        depth.amounts.append(level * 1e-18)
+    return depth
 
 
 def get_depth(
@@ -170,17 +283,13 @@ def get_depth(
     other_index: int,
     buy: bool,
 ) -> PoolSales:
-    depth = PoolSales(prices=[], amounts=[], bid=buy)
-    levels = np.linspace(1e18, max_amount, 100)
-    for i, level in enumerate(levels):
-        level = int(level)
-        if buy:
-            price = level / pool.get_dy(other_index, mkusd_index, level)
-        else:
-            price = pool.get_dy(mkusd_index, other_index, level) / level
-        depth.prices.append(price)
-        depth.amounts.append(level * 1e-18)
-    return depth
+    levels = _depth_levels(max_amount)
+    if buy:
+        i, j = other_index, mkusd_index
+    else:
+        i, j = mkusd_index, other_index
+    received = pool.get_dy_batch(i, j, levels)
+    return _sales_from_sweep(levels, received, buy, partial(pool.get_dy, i, j))
 
 
 def get_metapool_depth(
@@ -190,28 +299,22 @@ def get_metapool_depth(
     other_index: int,
     buy: bool,
 ) -> PoolSales:
-    depth = PoolSales(prices=[], amounts=[], bid=buy)
-    levels = np.linspace(1e18, max_amount, 100)
-    for i, level in enumerate(levels):
-        level = int(level)
-        if buy:
-            price = level / pool.get_dy_underlying(
-                other_index, mkusd_index, level
-            )
-        else:
-            price = (
-                pool.get_dy_underlying(mkusd_index, other_index, level) / level
-            )
-        depth.prices.append(price)
-        depth.amounts.append(level * 1e-18)
-    return depth
+    levels = _depth_levels(max_amount)
+    if buy:
+        i, j = other_index, mkusd_index
+    else:
+        i, j = mkusd_index, other_index
+    received = pool.get_dy_underlying_batch(i, j, levels)
+    return _sales_from_sweep(
+        levels, received, buy, partial(pool.get_dy_underlying, i, j)
+    )
 
 
-async def handle_stable_pool(
-    chain: str,
-    pool_details: PoolDetails,
-) -> list[PoolDepth]:
-    pool_details.balances = await get_pool_balances(chain, pool_details)
+def simulate_stable_pool(pool_details: PoolDetails) -> list[PoolDepth]:
+    if pool_details.balances is None:
+        logger.error(f"No balances for pool {pool_details.name}")
+        return []
+    max_amount = max(pool_details.balances)
     pool = CurvePool(
         A=pool_details.A,
         D=pool_details.balances,
@@ -223,7 +326,7 @@ async def handle_stable_pool(
         pool=pool,
         mkusd_index=pool_details.mkusd_index,
         other_index=1 - pool_details.mkusd_index,
-        max_amount=max(pool_details.balances),
+        max_amount=max_amount,
         buy=False,
     )
 
@@ -231,7 +334,7 @@ async def handle_stable_pool(
         pool=pool,
         mkusd_index=pool_details.mkusd_index,
         other_index=1 - pool_details.mkusd_index,
-        max_amount=max(pool_details.balances),
+        max_amount=max_amount,
         buy=True,
     )
 
@@ -249,25 +352,13 @@ async def handle_stable_pool(
     ]
 
 
-async def handle_metapool(
-    chain: str, metapool_details: PoolDetails
+def simulate_metapool(
+    metapool_details: PoolDetails, basepool_details: PoolDetails
 ) -> list[PoolDepth]:
-    metapool_details.balances = await get_pool_balances(
-        chain, metapool_details
-    )
-    if not metapool_details.basepool:
-        logger.error("No base pool associated to metapool")
+    if metapool_details.balances is None or basepool_details.balances is None:
+        logger.error(f"No balances for pool {metapool_details.name}")
         return []
-
-    basepool_details = await _get_base_pool_info(
-        chain, metapool_details.basepool
-    )
-    if not basepool_details:
-        return []
-    basepool_details.balances = await get_pool_balances(
-        chain, basepool_details
-    )
-
+    max_amount = max(metapool_details.balances)
     sim_basepool = CurvePool(
         A=basepool_details.A,
         D=basepool_details.balances,
@@ -293,14 +384,14 @@ async def handle_metapool(
             pool=sim_metapool,
             mkusd_index=0,
             other_index=coin_index,
-            max_amount=max(metapool_details.balances),
+            max_amount=max_amount,
             buy=True,
         )
         ask = get_metapool_depth(
             pool=sim_metapool,
             mkusd_index=0,
             other_index=coin_index,
-            max_amount=max(metapool_details.balances),
+            max_amount=max_amount,
             buy=False,
         )
         res.append(
@@ -315,15 +406,63 @@ async def handle_metapool(
     return res
 
 
+def get_simulation_pool():
+    # billiard, unlike multiprocessing, lets celery's daemonic workers
+    # start child processes
+    global simulation_pool
+    if simulation_pool is None:
+        simulation_pool = billiard.Pool(processes=SIMULATION_PROCESSES)
+    return simulation_pool
+
+
+def close_simulation_pool():
+    global simulation_pool
+    if simulation_pool is not None:
+        simulation_pool.terminate()
+        simulation_pool.join()
+        simulation_pool = None
+
+
+async def _simulate(func: Callable[..., list[PoolDepth]], *args):
+    # the simulations are CPU bound, they run in worker processes so they
+    # don't block the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, get_simulation_pool().apply, func, args
+    )
+
+
+@task_lock()
 async def update_depth_charts(chain: str):
     pools = await _get_all_relevant_pools(chain)
-    res: list[PoolDepth] = []
+    base_pools = await _get_base_pools_info(
+        chain,
+        {pool.basepool for pool in pools if pool.metapool and pool.basepool},
+    )
+    queried = pools + list(base_pools.values())
+    for details, balances in zip(
+        queried, await get_pool_balances(chain, queried)
+    ):
+        details.balances = balances
+
+    simulations = []
     for pool in pools:
         logger.info(f"Getting depth chart data for pool {pool}")
-        if pool.metapool:
-            res += await handle_metapool(chain, pool)
+        if not pool.metapool:
+            simulations.append(_simulate(simulate_stable_pool, pool))
+        elif pool.basepool in base_pools:
+            simulations.append(
+                _simulate(simulate_metapool, pool, base_pools[pool.basepool])
+            )
         else:
-            res += await handle_stable_pool(chain, pool)
+            logger.error(f"No base pool associated to metapool {pool.name}")
+
+    res: list[PoolDepth] = []
+    for result in await asyncio.gather(*simulations, return_exceptions=True):
+        if isinstance(result, BaseException):
+            logger.error(f"Error simulating pool depth: {result}")
+            continue
+        res += result
     redis = await get_redis_client("celery")
     await redis.set(
         f"{DEPTH_SLUG}_{chain}", json.dumps([r.dict() for r in res])
@@ -332,4 +471,4 @@ async def update_depth_charts(chain: str):
 
 @celery.task
 def get_depth_data(chain: str):
-    asyncio.run(update_depth_charts(chain))
+    run_in_worker(update_depth_charts, chain)
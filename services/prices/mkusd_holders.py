@@ -1,14 +1,15 @@
-import asyncio
 import json
 import time
 
-import aiohttp
 from web3 import Web3
 
+from database.engine import run_in_worker
 from services.celery import celery
 from services.messaging.redis import get_redis_client
+from services.task_lock import task_lock
 from settings.config import settings
 from utils.const import CHAINS, LABELS
+from utils.http import get_http_session
 
 url = "https://api-v2.flipsidecrypto.xyz/json-rpc"
 API_KEY = settings.FLIPSIDE_API_KEY
@@ -57,12 +58,12 @@ async def _run_holders_query() -> str:
         ],
         "id": 1,
     }
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            url, headers=headers, data=json.dumps(data)
-        ) as response:
-            result = await response.json()
-            return result["result"]["queryRun"]["id"]
+    session = await get_http_session()
+    async with session.post(
+        url, headers=headers, data=json.dumps(data)
+    ) as response:
+        result = await response.json()
+        return result["result"]["queryRun"]["id"]
 
 
 async def _check_query_status(query_run_id: str):
@@ -74,12 +75,10 @@ async def _check_query_status(query_run_id: str):
             "id": 1,
         }
     )
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            url, headers=headers, data=payload
-        ) as response:
-            result = await response.json()
-            return result["result"]["queryRun"]["state"]
+    session = await get_http_session()
+    async with session.post(url, headers=headers, data=payload) as response:
+        result = await response.json()
+        return result["result"]["queryRun"]["state"]
 
 
 async def _get_query_results(
@@ -100,11 +99,9 @@ async def _get_query_results(
         }
     )
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            url, headers=headers, data=payload
-        ) as response:
-            data = await response.json()
+    session = await get_http_session()
+    async with session.post(url, headers=headers, data=payload) as response:
+        data = await response.json()
 
     def _format_address(address: str, chain_name: str):
         checksumed_address = Web3.to_checksum_address(address)
@@ -130,6 +127,7 @@ async def _get_query_results(
     return res
 
 
+@task_lock()
 async def update_holders(chain: str):
     query_run_id = await _run_holders_query()
     attempts = 0
@@ -148,4 +146,4 @@ async def update_holders(chain: str):
 
 @celery.task
 def get_holder_data(chain: str):
-    asyncio.run(update_holders(chain))
+    run_in_worker(update_holders, chain)
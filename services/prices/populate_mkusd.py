@@ -1,14 +1,14 @@
-import asyncio
 import logging
 from datetime import datetime, timezone
 
 import requests
 from pydantic import BaseModel
 
-from database.engine import db, wrap_dbs
+from database.engine import db, run_in_worker
 from database.models.common import StableCoinPrice
 from database.utils import upsert_query
 from services.celery import celery
+from services.task_lock import task_lock
 from utils.const import STABLECOINS
 from utils.const.chains import ethereum
 
@@ -52,6 +52,7 @@ async def _update_db_with_llama_prices(
         await db.execute(query)
 
 
+@task_lock()
 async def update_mkusd_price_history(
     chain: str = ethereum.CHAIN_NAME, chain_id: int = ethereum.CHAIN_ID
 ):
@@ -61,4 +62,4 @@ async def update_mkusd_price_history(
 
 @celery.task
 def populate_mkusd_price_history(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(update_mkusd_price_history)(chain, chain_id))
+    run_in_worker(update_mkusd_price_history, chain, chain_id)
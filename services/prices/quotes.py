@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+import time
+from decimal import Decimal
+
+from settings.config import settings
+from utils.http import get_http_session
+
+logger = logging.getLogger()
+
+ETH_ADDRESS = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+headers = {"accept": "application/json", "Content-Type": "application/json"}
+
+# quotes are reused for the same token and size within a window of blocks
+BLOCK_TIME = 12
+QUOTE_BLOCK_WINDOW = 25
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` requests per second with bursts of up to
+    `capacity`. Callers reserve a token without yielding and then sleep
+    until it is due, so waiting requests are served in order and the
+    bucket can be shared by event loops started one after the other.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+rate_limiters = {
+    "cowswap": TokenBucket(rate=5, capacity=5),
+    "1inch": TokenBucket(rate=0.5, capacity=1),
+    "paraswap": TokenBucket(rate=2, capacity=2),
+}
+
+quote_cache: dict[tuple[str, str, Decimal, int], Decimal] = {}
+
+
+def _block_window() -> int:
+    return int(time.time() // (BLOCK_TIME * QUOTE_BLOCK_WINDOW))
+
+
+async def get_cowswap_quote(sell_token: str, sell_amount: Decimal) -> Decimal:
+    url = f"{settings.COWSWAP_API_URL}/quote"
+    params = {
+        "sellToken": sell_token,
+        "buyToken": ETH_ADDRESS.lower(),
+        "receiver": ZERO_ADDRESS,
+        "appData": '{"version":"0.9.0","metadata":{}}',
+        "appDataHash": "0xc990bae86208bfdfba8879b64ab68da5905e8bb97aa3da5c701ec1183317a6f6",
+        "partiallyFillable": False,
+        "sellTokenBalance": "erc20",
+        "buyTokenBalance": "erc20",
+        "from": ZERO_ADDRESS,
+        "signingScheme": "eip712",
+        "onchainOrder": False,
+        "kind": "sell",
+        "sellAmountBeforeFee": str(sell_amount),
+    }
+    session = await get_http_session()
+    async with session.post(
+        url, headers=headers, data=json.dumps(params)
+    ) as response:
+        data = await response.json()
+        bought = sell_amount - Decimal(data["quote"]["feeAmount"])
+        return (
+            Decimal(data["quote"]["buyAmount"]) / bought
+            if bought != 0
+            else Decimal(0)
+        )
+
+
+async def get_1inch_quote(sell_token: str, sell_amount: Decimal) -> Decimal:
+    url = f"{settings.ONEINCH_API_URL}/quote"
+    params = {
+        "src": sell_token,
+        "dst": ETH_ADDRESS,
+        "amount": str(sell_amount),
+        "includeGas": "false",
+    }
+    session = await get_http_session()
+    async with session.get(url, params=params) as response:
+        data = await response.json()
+        return Decimal(data["toAmount"]) / sell_amount
+
+
+async def get_paraswap_quote(
+    sell_token: str, sell_amount: Decimal, sell_decimals: int = 18
+) -> Decimal:
+    url = f"{settings.PARASWAP_API_URL}/prices/"
+    params = {
+        "srcToken": sell_token,
+        "destToken": ETH_ADDRESS,
+        "amount": str(sell_amount),
+        "srcDecimals": str(sell_decimals),
+        "destDecimals": "18",
+        "partner": "llamaswap",
+        "side": "SELL",
+        "network": "1",
+        "excludeDEXS": "ParaSwapPool,ParaSwapLimitOrders",
+    }
+    session = await get_http_session()
+    async with session.get(url, params=params) as response:
+        data = await response.json()
+        return Decimal(data["priceRoute"]["destAmount"]) / sell_amount
+
+
+QUOTE_SOURCES = {
+    "cowswap": get_cowswap_quote,
+    "1inch": get_1inch_quote,
+    "paraswap": get_paraswap_quote,
+}
+
+
+async def get_quote(
+    aggregator: str, sell_token: str, sell_amount: Decimal
+) -> Decimal:
+    """
+    Returns the price quoted by an aggregator, waiting for its rate limiter
+    and reusing quotes from the current block window. Returns 0 when no
+    quote could be obtained.
+    """
+    if sell_amount == 0:
+        return Decimal(0)
+    key = (aggregator, sell_token.lower(), sell_amount, _block_window())
+    if key in quote_cache:
+        return quote_cache[key]
+    await rate_limiters[aggregator].acquire()
+    try:
+        price = await QUOTE_SOURCES[aggregator](sell_token, sell_amount)
+    except Exception as e:
+        logger.error(
+            f"Error fetching {aggregator} quote for token {sell_token}: {e}"
+        )
+        return Decimal(0)
+    window = key[-1]
+    for stale in [k for k in quote_cache if k[-1] != window]:
+        del quote_cache[stale]
+    quote_cache[key] = price
+    return price
+
+
+async def get_best_price(sell_token: str, sell_amount: Decimal) -> Decimal:
+    quotes = await asyncio.gather(
+        *[
+            get_quote(aggregator, sell_token, sell_amount)
+            for aggregator in QUOTE_SOURCES
+        ]
+    )
+    return min([q for q in quotes if q > 0], default=Decimal(0))
@@ -37,7 +37,7 @@ HOLDERS_SCHEDULE = {
 }
 
 DEPTH_SCHEDULE = {
-    f"update-holders-{chain}": {
+    f"update-depth-{chain}": {
         "task": "services.prices.liquidity_depth.get_depth_data",
         "schedule": timedelta(minutes=60),
         "args": (chain,),
@@ -103,7 +103,7 @@ DAO_INCENTIVE_SYNC_SCHEDULE = {
 }
 
 BOOST_DATA_SCHEDULE = {
-    f"sync-dao-incentive-{chain}": {
+    f"sync-dao-boost-{chain}": {
         "task": "services.dao.sync.back_populate_boost_data",
         "schedule": timedelta(minutes=60 * 24),
         "args": (
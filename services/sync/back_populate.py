@@ -2,14 +2,15 @@ import asyncio
 import logging
 import sys
 import traceback
+from typing import Iterable
 
-from database.engine import db, wrap_dbs
+from database.engine import db, run_in_worker, wrap_dbs
 from database.models.common import Chain
 from database.models.troves import Collateral, StabilityPool, TroveManager
 from database.utils import update_by_id_query, upsert_query
 from services.celery import celery
 from services.sync.collateral import update_price_records
-from services.sync.models import ChainData
+from services.sync.models import ChainData, CollateralData, TroveManagerData
 from services.sync.populate_entities import insert_main_entities
 from services.sync.stability_pool import (
     update_pool_operations,
@@ -18,7 +19,10 @@ from services.sync.stability_pool import (
 from services.sync.trove_manager_snapshots import update_manager_snapshots
 from services.sync.trove_snapshots import update_trove_snapshots
 from services.sync.update_cues import get_data_for_chain
+from services.sync.utils import gather_with_concurrency, run_isolated
 from services.sync.zaps import update_zap_records
+from services.task_lock import LockPolicy, task_lock
+from settings.config import settings
 from utils.const import CHAINS, ethereum
 
 logger = logging.getLogger()
@@ -40,12 +44,12 @@ def back_populate_all():
 
 @celery.task
 def back_populate_chain(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(sync_from_subgraph)(chain, chain_id))
+    run_in_worker(sync_from_subgraph, chain, chain_id)
 
 
 @celery.task
 def sync_zaps(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(update_zap_records)(chain, chain_id))
+    run_in_worker(update_zap_records, chain, chain_id)
 
 
 async def _update_stability_pool(
@@ -106,108 +110,147 @@ async def _update_stability_pool(
             await db.execute(query)
 
 
+async def _update_single_collateral(
+    chain: str,
+    collateral: int,
+    collateral_data: CollateralData,
+    previous_data: ChainData,
+):
+    if (
+        collateral not in previous_data.collateral_data
+        or collateral_data.latest_price
+        != previous_data.collateral_data[collateral].latest_price
+    ):
+        logger.info(
+            f"Detected collateral price change for {collateral}, syncing price records"
+        )
+        try:
+            await update_price_records(chain=chain, collateral_id=collateral)
+        except Exception as e:
+            logger.error(
+                f"Could not update price records, reverting collateral price data: {e}\n{traceback.format_exc()}"
+            )
+            data = {
+                "latest_price": previous_data.collateral_data[
+                    collateral
+                ].latest_price
+                if collateral in previous_data.collateral_data
+                else 0
+            }
+            query = update_by_id_query(Collateral, collateral, data)
+            await db.execute(query)
+
+
 async def _update_collateral(
     chain: str, previous_data: ChainData, new_data: ChainData
 ):
-    for collateral, collateral_data in new_data.collateral_data.items():
-        if (
-            collateral not in previous_data.collateral_data
-            or collateral_data.latest_price
-            != previous_data.collateral_data[collateral].latest_price
-        ):
-            logger.info(
-                f"Detected collateral price change for {collateral}, syncing price records"
-            )
-            try:
-                await update_price_records(
-                    chain=chain, collateral_id=collateral
-                )
-            except Exception as e:
-                logger.error(
-                    f"Could not update price records, reverting collateral price data: {e}\n{traceback.format_exc()}"
-                )
-                data = {
-                    "latest_price": previous_data.collateral_data[
-                        collateral
-                    ].latest_price
-                    if collateral in previous_data.collateral_data
-                    else 0
-                }
-                query = update_by_id_query(Collateral, collateral, data)
-                await db.execute(query)
+    results = await gather_with_concurrency(
+        settings.SYNC_CONCURRENCY,
+        *(
+            _update_single_collateral(
+                chain, collateral, collateral_data, previous_data
+            )
+            for collateral, collateral_data in new_data.collateral_data.items()
+        ),
+    )
+    _log_failures("collateral", new_data.collateral_data.keys(), results)
 
 
-async def _update_manager(
-    chain: str, previous_data: ChainData, new_data: ChainData
+async def _update_single_manager(
+    chain: str,
+    manager: int,
+    new_manager_data: TroveManagerData,
+    previous_data: ChainData,
 ):
-    for manager, new_manager_data in new_data.trove_manager_data.items():
-        if (
-            manager not in previous_data.trove_manager_data
-            or new_manager_data.snapshots_count
-            != previous_data.trove_manager_data[manager].snapshots_count
-        ):
-            from_index = (
-                previous_data.trove_manager_data[manager].snapshots_count
+    if (
+        manager not in previous_data.trove_manager_data
+        or new_manager_data.snapshots_count
+        != previous_data.trove_manager_data[manager].snapshots_count
+    ):
+        from_index = (
+            previous_data.trove_manager_data[manager].snapshots_count
+            if manager in previous_data.trove_manager_data
+            else 0
+        )
+        try:
+            await update_manager_snapshots(
+                chain=chain,
+                manager_id=manager,
+                from_index=from_index,
+                to_index=new_manager_data.snapshots_count,
+            )
+        except Exception as e:
+            logger.error(
+                f"Error updating manager snapshots: {e}, resetting snapshot count\n{traceback.format_exc()}"
+            )
+            data = {
+                "snapshots_count": previous_data.trove_manager_data[
+                    manager
+                ].snapshots_count
                 if manager in previous_data.trove_manager_data
                 else 0
+            }
+            query = update_by_id_query(TroveManager, manager, data)
+            await db.execute(query)
+
+    if (
+        manager not in previous_data.trove_manager_data
+        or new_manager_data.trove_snapshots_count
+        != previous_data.trove_manager_data[manager].trove_snapshots_count
+    ):
+        from_index = (
+            previous_data.trove_manager_data[manager].trove_snapshots_count
+            if manager in previous_data.trove_manager_data
+            else 0
+        )
+        try:
+            await update_trove_snapshots(
+                chain=chain,
+                manager_id=manager,
+                from_index=from_index,
+                to_index=new_manager_data.trove_snapshots_count,
+            )
+        except Exception as e:
+            logger.error(
+                f"Error updating trove snapshots: {e}, resetting snapshout count\n{traceback.format_exc()}"
             )
-            try:
-                await update_manager_snapshots(
-                    chain=chain,
-                    manager_id=manager,
-                    from_index=from_index,
-                    to_index=new_data.trove_manager_data[
-                        manager
-                    ].snapshots_count,
-                )
-            except Exception as e:
-                logger.error(
-                    f"Error updating manager snapshots: {e}, resetting snapshot count\n{traceback.format_exc()}"
-                )
-                data = {
-                    "snapshots_count": previous_data.trove_manager_data[
-                        manager
-                    ].snapshots_count
-                    if manager in previous_data.trove_manager_data
-                    else 0
-                }
-                query = update_by_id_query(TroveManager, manager, data)
-                await db.execute(query)
-
-        if (
-            manager not in previous_data.trove_manager_data
-            or new_manager_data.trove_snapshots_count
-            != previous_data.trove_manager_data[manager].trove_snapshots_count
-        ):
-            from_index = (
-                previous_data.trove_manager_data[manager].trove_snapshots_count
+            data = {
+                "trove_snapshots_count": previous_data.trove_manager_data[
+                    manager
+                ].trove_snapshots_count
                 if manager in previous_data.trove_manager_data
                 else 0
+            }
+            query = update_by_id_query(TroveManager, manager, data)
+            await db.execute(query)
+
+
+async def _update_manager(
+    chain: str, previous_data: ChainData, new_data: ChainData
+):
+    # each manager's data is independent so they can be synced side by side,
+    # counters are still reset per manager on failure
+    results = await gather_with_concurrency(
+        settings.SYNC_CONCURRENCY,
+        *(
+            _update_single_manager(
+                chain, manager, new_manager_data, previous_data
             )
-            try:
-                await update_trove_snapshots(
-                    chain=chain,
-                    manager_id=manager,
-                    from_index=from_index,
-                    to_index=new_data.trove_manager_data[
-                        manager
-                    ].trove_snapshots_count,
-                )
-            except Exception as e:
-                logger.error(
-                    f"Error updating trove snapshots: {e}, resetting snapshout count\n{traceback.format_exc()}"
-                )
-                data = {
-                    "trove_snapshots_count": previous_data.trove_manager_data[
-                        manager
-                    ].trove_snapshots_count
-                    if manager in previous_data.trove_manager_data
-                    else 0
-                }
-                query = update_by_id_query(TroveManager, manager, data)
-                await db.execute(query)
+            for manager, new_manager_data in new_data.trove_manager_data.items()
+        ),
+    )
+    _log_failures("manager", new_data.trove_manager_data.keys(), results)
 
 
+def _log_failures(kind: str, keys: Iterable[int], results: list):
+    for key, result in zip(keys, results):
+        if isinstance(result, Exception):
+            logger.error(
+                f"Unhandled error while syncing {kind} {key}: {result}\n{''.join(traceback.format_exception(result))}"
+            )
+
+
+@task_lock(LockPolicy.coalesce)
 async def sync_from_subgraph(
     chain: str = ethereum.CHAIN_NAME, chain_id: int = ethereum.CHAIN_ID
 ):
@@ -217,20 +260,32 @@ async def sync_from_subgraph(
     if not new_data:
         raise Exception("Failed to retrieve update cues data from the graph")
 
-    await _update_stability_pool(
-        chain=chain,
-        chain_id=chain_id,
-        new_data=new_data,
-        previous_data=previous_data,
-    )
-
-    await _update_collateral(
-        chain=chain, new_data=new_data, previous_data=previous_data
-    )
-
-    await _update_manager(
-        chain=chain, new_data=new_data, previous_data=previous_data
+    # phases sync independent datasets so they are run concurrently, each
+    # on its own connection
+    results = await asyncio.gather(
+        run_isolated(
+            _update_stability_pool(
+                chain=chain,
+                chain_id=chain_id,
+                new_data=new_data,
+                previous_data=previous_data,
+            )
+        ),
+        run_isolated(
+            _update_collateral(
+                chain=chain, new_data=new_data, previous_data=previous_data
+            )
+        ),
+        run_isolated(
+            _update_manager(
+                chain=chain, new_data=new_data, previous_data=previous_data
+            )
+        ),
+        return_exceptions=True,
     )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
 
 
 if __name__ == "__main__":
@@ -1,24 +1,34 @@
 import logging
 from typing import Any
 
+from api.routes.v1.websocket.troves_overview.models import (
+    TroveOverviewSettings,
+)
 from database.engine import db
 from database.models.troves import PriceRecord
 from database.queries.collateral import get_collateral_address_by_id
 from database.queries.price_records import get_latest_price_record_timestamp
 from database.utils import upsert_query
 from services.celery import celery
-from utils.const import SUBGRAPHS
-from utils.subgraph.query import async_grt_query
+from services.messaging.handler import TROVE_OVERVIEW_UPDATE
+from services.messaging.invalidation import Dataset
+from services.messaging.pubsub import publish_dataset_changed, publish_message
+from utils.const import CHAINS, SUBGRAPHS
+from utils.subgraph.query import prefetch_keyset_pages
 
 logger = logging.getLogger()
 
+# several records can share a timestamp, so pages are keyed on the unique id
+# while the timestamp only bounds the sync to new records
 PRICE_RECORDS_QUERY = """
 {
-  priceRecords(first: 1000 skip: %d where:
-    {blockTimestamp_gte: %d
+  priceRecords(first: 1000 where:
+    {blockTimestamp_gt: %d
+      id_gt: "%s"
       collateral:"%s"}
-    orderBy: blockTimestamp
-    orderDirection: desc) {
+    orderBy: id
+    orderDirection: asc) {
+    id
     price
     blockNumber
     blockTimestamp
@@ -40,28 +50,25 @@ async def update_price_records(chain: str, collateral_id: int):
         raise Exception(
             f"Could not retrieve collateral address for collateral id {collateral_id}"
         )
-    # fetch the last 5000 records (or less) since last timestamp
+    # fetch all records since last timestamp
     records: list[dict[str, Any]] = []
-    for i in range(6):
-        query = PRICE_RECORDS_QUERY % (
-            i * 1000,
-            last_timestamp,
-            collateral_address.lower(),
-        )
-        price_data = await async_grt_query(endpoint=endpoint, query=query)
-        if not price_data:
-            raise Exception(
-                f"Unable to retrieve price data from the graph {query}"
-            )
-        price_records = price_data["priceRecords"]
-        if len(price_records) > 0:
-            records += price_records
-        else:
-            break
-        # if we didn't reach max capacity we can stop early
-        if len(price_data) < 1000:
-            break
+    async with prefetch_keyset_pages(
+        endpoint,
+        lambda cursor: PRICE_RECORDS_QUERY
+        % (last_timestamp, cursor, collateral_address.lower()),
+        entity="priceRecords",
+        cursor_field="id",
+        start="",
+    ) as pages:
+        async for query, price_data in pages:
+            if not price_data:
+                raise Exception(
+                    f"Unable to retrieve price data from the graph {query}"
+                )
+            records += price_data["priceRecords"]
 
+    # write in chronological order as pages come in id order
+    records.sort(key=lambda record: int(record["blockTimestamp"]))
     for record in records:
         index = {
             "collateral_id": collateral_id,
@@ -74,3 +81,9 @@ async def update_price_records(chain: str, collateral_id: int):
         }
         query = upsert_query(PriceRecord, index, data)
         await db.execute(query)
+    if records:
+        # the overview's TVL and ratios are valued at the latest price
+        await publish_message(
+            TROVE_OVERVIEW_UPDATE, TroveOverviewSettings(chain=chain).json()
+        )
+        await publish_dataset_changed(Dataset.collateral_prices, CHAINS[chain])
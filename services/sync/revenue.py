@@ -1,13 +1,15 @@
-import asyncio
 import logging
 
-from database.engine import db, wrap_dbs
+from database.engine import db, run_in_worker
 from database.models.common import RevenueSnapshot
 from database.queries.revenue_snapshots import (
     get_latest_revenue_snapshot_timestamp,
 )
 from database.utils import upsert_query
 from services.celery import celery
+from services.messaging.invalidation import Dataset
+from services.messaging.pubsub import publish_dataset_changed
+from services.task_lock import task_lock
 from utils.const import CHAINS, SUBGRAPHS
 from utils.subgraph.query import async_grt_query
 
@@ -29,9 +31,10 @@ REVENUE_QUERY = """
 
 @celery.task
 def update_revenue_snapshots(chain: str, chain_id: int):
-    asyncio.run(wrap_dbs(get_revenue_snapshots)(chain, chain_id))
+    run_in_worker(get_revenue_snapshots, chain, chain_id)
 
 
+@task_lock()
 async def get_revenue_snapshots(chain: str, chain_id: int):
     endpoint = SUBGRAPHS[chain]
     last_timestamp = await get_latest_revenue_snapshot_timestamp(chain_id)
@@ -57,3 +60,4 @@ async def get_revenue_snapshots(chain: str, chain_id: int):
         }
         query = upsert_query(RevenueSnapshot, index, data)
         await db.execute(query)
+    await publish_dataset_changed(Dataset.revenue, chain_id)
@@ -5,15 +5,20 @@ from api.routes.v1.websocket.troves_overview.models import (
     TroveOverviewSettings,
 )
 from database.engine import db
-from database.models.troves import TroveManagerParameter, TroveManagerSnapshot
+from database.models.troves import (
+    TroveManagerDailyRollup,
+    TroveManagerParameter,
+    TroveManagerSnapshot,
+)
 from database.queries.trove_manager import get_manager_address_by_id_and_chain
 from database.utils import upsert_query
 from services.celery import celery
 from services.messaging.handler import TROVE_OVERVIEW_UPDATE
-from services.messaging.pubsub import publish_message
+from services.messaging.invalidation import Dataset
+from services.messaging.pubsub import publish_dataset_changed, publish_message
 from services.sync.utils import get_snapshot_query_setup
 from utils.const import CHAINS
-from utils.subgraph.query import async_grt_query
+from utils.subgraph.query import prefetch_pages
 
 logger = logging.getLogger()
 
@@ -71,6 +76,84 @@ TROVE_MANAGER_SNAPSHOT_QUERY = """
 }
 """
 
+# aggregated values of a rollup bucket, in the order selected below
+ROLLUP_VALUES = [
+    "snapshots",
+    "last_timestamp",
+    "last_index",
+    "last_collateral_price",
+    "last_collateral_ratio",
+    "max_collateral_ratio",
+    "last_total_collateral_usd",
+    "max_total_collateral_usd",
+    "avg_total_collateral_usd",
+    "last_total_debt",
+    "max_total_debt",
+    "avg_total_debt",
+    "last_open_troves",
+    "max_open_troves",
+]
+
+# buckets are rebuilt from the raw snapshots rather than merged with the
+# incoming ones, so re-ingesting a page can't count snapshots twice
+# the max ratio leaves out snapshots missing their collateral or debt value,
+# as the ratio history always did
+ROLLUP_QUERY = """
+INSERT INTO %s (manager_id, bucket, %s)
+SELECT
+    manager_id,
+    FLOOR(block_timestamp / :bucket_size) * :bucket_size AS bucket,
+    COUNT(*),
+    MAX(block_timestamp),
+    (ARRAY_AGG(index ORDER BY block_timestamp DESC, index DESC))[1],
+    (ARRAY_AGG(collateral_price ORDER BY block_timestamp DESC, index DESC))[1],
+    (ARRAY_AGG(collateral_ratio ORDER BY block_timestamp DESC, index DESC))[1],
+    MAX(collateral_ratio) FILTER (
+        WHERE total_collateral_usd IS NOT NULL AND total_debt IS NOT NULL
+    ),
+    (ARRAY_AGG(total_collateral_usd ORDER BY block_timestamp DESC, index DESC))[1],
+    MAX(total_collateral_usd),
+    AVG(total_collateral_usd),
+    (ARRAY_AGG(total_debt ORDER BY block_timestamp DESC, index DESC))[1],
+    MAX(total_debt),
+    AVG(total_debt),
+    (ARRAY_AGG(open_troves ORDER BY block_timestamp DESC, index DESC))[1],
+    MAX(open_troves)
+FROM
+    trove_manager_snapshots
+WHERE
+    manager_id = :manager_id
+    AND block_timestamp >= :start
+    AND block_timestamp < :end
+GROUP BY
+    manager_id, bucket
+ON CONFLICT (manager_id, bucket) DO UPDATE SET %s
+"""
+
+
+async def update_manager_rollups(
+    manager_id: int, from_timestamp: int, to_timestamp: int
+):
+    """
+    Recomputes the daily rollups of the days spanned by `from_timestamp`
+    and `to_timestamp`.
+    """
+    size = TroveManagerDailyRollup.bucket_size
+    query = ROLLUP_QUERY % (
+        TroveManagerDailyRollup.__tablename__,
+        ", ".join(ROLLUP_VALUES),
+        ", ".join(f"{c} = EXCLUDED.{c}" for c in ROLLUP_VALUES),
+    )
+    await db.execute(
+        query,
+        values={
+            "manager_id": manager_id,
+            "bucket_size": size,
+            "start": from_timestamp - from_timestamp % size,
+            "end": (to_timestamp // size + 1) * size,
+        },
+    )
+
 
 @celery.task
 async def _update_parameters(
@@ -121,71 +204,83 @@ async def update_manager_snapshots(
     if not manager_address:
         raise Exception(f"Unable to retrieve address of manager {manager_id}")
 
-    for index in range(from_index, to_index, 1000):
-        query = TROVE_MANAGER_SNAPSHOT_QUERY % (
-            manager_address,
-            index,
-        )
+    queries = (
+        TROVE_MANAGER_SNAPSHOT_QUERY % (manager_address, index)
+        for index in range(from_index, to_index, 1000)
+    )
+    logger.info(
+        f"Updating trove manager snapshots from index {from_index} to {to_index} for {manager_address}"
+    )
+    async with prefetch_pages(endpoint, queries) as pages:
+        async for query, snapshot_data in pages:
+            if not snapshot_data:
+                raise Exception(
+                    f"Did not receive any data from the graph on chain {chain} when query for trove manager snapshots {query}"
+                )
+            for snapshot in snapshot_data["troveManagerSnapshots"]:
+                parameters_id = await _update_parameters(
+                    manager_id, snapshot["parameters"]
+                )
 
-        logger.info(
-            f"Updating trove manager snapshots from index {from_index} to {to_index} for {manager_address} - batch: {index}"
-        )
-        snapshot_data = await async_grt_query(endpoint=endpoint, query=query)
-        if not snapshot_data:
-            raise Exception(
-                f"Did not receive any data from the graph on chain {chain} when query for trove manager snapshots {query}"
-            )
-        for snapshot in snapshot_data["troveManagerSnapshots"]:
-            parameters_id = await _update_parameters(
-                manager_id, snapshot["parameters"]
-            )
-
-            indexes = {
-                "manager_id": manager_id,
-                "index": snapshot["index"],
-                "block_timestamp": snapshot["blockTimestamp"],
-            }
-
-            data = {
-                "collateral_price": snapshot["collateralPrice"],
-                "rate": snapshot["rate"],
-                "borrowing_fee": snapshot["borrowingFee"],
-                "total_collateral": snapshot["totalCollateral"],
-                "total_collateral_usd": snapshot["totalCollateralUSD"],
-                "total_debt": snapshot["totalDebt"],
-                "collateral_ratio": snapshot["collateralRatio"],
-                "total_stakes": snapshot["totalStakes"],
-                "total_borrowing_fees_paid": snapshot[
-                    "totalBorrowingFeesPaid"
-                ],
-                "total_redemption_fees_paid": snapshot[
-                    "totalRedemptionFeesPaid"
-                ],
-                "total_redemption_fees_paid_usd": snapshot[
-                    "totalRedemptionFeesPaidUSD"
-                ],
-                "total_collateral_redistributed": snapshot[
-                    "totalCollateralRedistributed"
-                ],
-                "total_collateral_redistributed_usd": snapshot[
-                    "totalCollateralRedistributedUSD"
-                ],
-                "total_debt_redistributed": snapshot["totalDebtRedistributed"],
-                "open_troves": snapshot["openTroves"],
-                "total_troves_opened": snapshot["totalTrovesOpened"],
-                "liquidated_troves": snapshot["liquidatedTroves"],
-                "total_troves_liquidated": snapshot["totalTrovesLiquidated"],
-                "redeemed_troves": snapshot["redeemedTroves"],
-                "total_troves_redeemed": snapshot["totalTrovesRedeemed"],
-                "closed_troves": snapshot["closedTroves"],
-                "total_troves_closed": snapshot["totalTrovesClosed"],
-                "total_troves": snapshot["totalTroves"],
-                "parameters_id": parameters_id,
-                "block_number": snapshot["blockNumber"],
-                "transaction_hash": snapshot["transactionHash"],
-            }
-            query = upsert_query(TroveManagerSnapshot, indexes, data)
-            await db.execute(query)
+                indexes = {
+                    "manager_id": manager_id,
+                    "index": snapshot["index"],
+                    "block_timestamp": snapshot["blockTimestamp"],
+                }
+
+                data = {
+                    "collateral_price": snapshot["collateralPrice"],
+                    "rate": snapshot["rate"],
+                    "borrowing_fee": snapshot["borrowingFee"],
+                    "total_collateral": snapshot["totalCollateral"],
+                    "total_collateral_usd": snapshot["totalCollateralUSD"],
+                    "total_debt": snapshot["totalDebt"],
+                    "collateral_ratio": snapshot["collateralRatio"],
+                    "total_stakes": snapshot["totalStakes"],
+                    "total_borrowing_fees_paid": snapshot[
+                        "totalBorrowingFeesPaid"
+                    ],
+                    "total_redemption_fees_paid": snapshot[
+                        "totalRedemptionFeesPaid"
+                    ],
+                    "total_redemption_fees_paid_usd": snapshot[
+                        "totalRedemptionFeesPaidUSD"
+                    ],
+                    "total_collateral_redistributed": snapshot[
+                        "totalCollateralRedistributed"
+                    ],
+                    "total_collateral_redistributed_usd": snapshot[
+                        "totalCollateralRedistributedUSD"
+                    ],
+                    "total_debt_redistributed": snapshot[
+                        "totalDebtRedistributed"
+                    ],
+                    "open_troves": snapshot["openTroves"],
+                    "total_troves_opened": snapshot["totalTrovesOpened"],
+                    "liquidated_troves": snapshot["liquidatedTroves"],
+                    "total_troves_liquidated": snapshot[
+                        "totalTrovesLiquidated"
+                    ],
+                    "redeemed_troves": snapshot["redeemedTroves"],
+                    "total_troves_redeemed": snapshot["totalTrovesRedeemed"],
+                    "closed_troves": snapshot["closedTroves"],
+                    "total_troves_closed": snapshot["totalTrovesClosed"],
+                    "total_troves": snapshot["totalTroves"],
+                    "parameters_id": parameters_id,
+                    "block_number": snapshot["blockNumber"],
+                    "transaction_hash": snapshot["transactionHash"],
+                }
+                query = upsert_query(TroveManagerSnapshot, indexes, data)
+                await db.execute(query)
+            timestamps = [
+                int(snapshot["blockTimestamp"])
+                for snapshot in snapshot_data["troveManagerSnapshots"]
+            ]
+            if timestamps:
+                await update_manager_rollups(
+                    manager_id, min(timestamps), max(timestamps)
+                )
     # push update to fastApi
     message = TroveOverviewSettings(chain=chain).json()
     await publish_message(TROVE_OVERVIEW_UPDATE, message)
+    await publish_dataset_changed(Dataset.manager_snapshots, chain_id)
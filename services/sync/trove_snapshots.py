@@ -1,5 +1,8 @@
 import logging
+import time
 
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from web3 import Web3
 
 from api.routes.v1.websocket.models import Channels, Payload
@@ -15,15 +18,18 @@ from database.models.troves import (
     Redemption,
     Trove,
     TroveSnapshot,
+    TroveState,
 )
 from database.queries.trove_manager import get_manager_address_by_id_and_chain
-from database.utils import insert_ignore_query, upsert_query
+from database.utils import batch_insert_ignore, batch_upsert_query
 from services.celery import celery
 from services.messaging.handler import TROVE_OPERATIONS_UPDATE
-from services.messaging.pubsub import publish_message
+from services.messaging.invalidation import Dataset
+from services.messaging.pubsub import publish_dataset_changed, publish_message
 from services.sync.utils import get_snapshot_query_setup
+from settings.config import settings
 from utils.const import CHAINS
-from utils.subgraph.query import async_grt_query
+from utils.subgraph.query import prefetch_pages
 
 logger = logging.getLogger()
 
@@ -127,20 +133,11 @@ def _str_to_trove_operation_enum(
     return operation_mapping[operation]
 
 
-async def _update_liquidation(chain_id: int, liquidation: dict) -> str | None:
-    if not liquidation:
-        return None
-    # create user entry
-    liquidator_id = liquidation["liquidator"]["id"].lower()
-    query = insert_ignore_query(User, {"id": liquidator_id}, {})
-    await db.execute(query)
-
-    liq_indexes = {
+def _liquidation_data(chain_id: int, liquidation: dict) -> dict:
+    return {
         "chain_id": chain_id,
-        "liquidator_id": liquidator_id,
+        "liquidator_id": liquidation["liquidator"]["id"].lower(),
         "block_timestamp": liquidation["blockTimestamp"],
-    }
-    liq_data = {
         "liquidated_debt": liquidation["liquidatedDebt"],
         "liquidated_collateral": liquidation["liquidatedCollateral"],
         "liquidated_collateral_usd": liquidation["liquidatedCollateralUSD"],
@@ -150,26 +147,13 @@ async def _update_liquidation(chain_id: int, liquidation: dict) -> str | None:
         "block_number": liquidation["blockNumber"],
         "transaction_hash": liquidation["transactionHash"],
     }
-    query = upsert_query(
-        Liquidation, liq_indexes, liq_data, return_columns=[Liquidation.id]
-    )
-    return await db.execute(query)
-
 
-async def _update_redemption(chain_id: int, redemption: dict) -> str | None:
-    if not redemption:
-        return None
-    # create user entry
-    redeemer_id = redemption["redeemer"]["id"].lower()
-    query = insert_ignore_query(User, {"id": redeemer_id}, {})
-    await db.execute(query)
 
-    red_indexes = {
+def _redemption_data(chain_id: int, redemption: dict) -> dict:
+    return {
         "chain_id": chain_id,
-        "redeemer_id": redeemer_id,
+        "redeemer_id": redemption["redeemer"]["id"].lower(),
         "block_timestamp": redemption["blockTimestamp"],
-    }
-    red_data = {
         "attempted_debt_amount": redemption["attemptedDebtAmount"],
         "actual_debt_amount": redemption["actualDebtAmount"],
         "collateral_sent": redemption["collateralSent"],
@@ -183,22 +167,14 @@ async def _update_redemption(chain_id: int, redemption: dict) -> str | None:
         "block_number": redemption["blockNumber"],
         "transaction_hash": redemption["transactionHash"],
     }
-    query = upsert_query(
-        Redemption, red_indexes, red_data, return_columns=[Redemption.id]
-    )
-    return await db.execute(query)
 
 
-async def _update_trove(manager_id: int, trove: dict) -> str:
+def _trove_data(manager_id: int, trove: dict) -> dict:
     if not trove:
         raise Exception(f"No trove data found for snapshot on {manager_id}")
-    # create user entry
-    user_id = trove["owner"]["id"].lower()
-    query = insert_ignore_query(User, {"id": user_id}, {})
-    await db.execute(query)
-
-    trove_indexes = {"manager_id": manager_id, "owner_id": user_id}
-    trove_data = {
+    return {
+        "manager_id": manager_id,
+        "owner_id": trove["owner"]["id"].lower(),
         "status": _str_to_trove_status_enum(trove["status"]),
         "snapshots_count": trove["snapshotsCount"],
         "collateral": trove["collateral"],
@@ -208,50 +184,194 @@ async def _update_trove(manager_id: int, trove: dict) -> str:
         "reward_snapshot_collateral": trove["rewardSnapshotDebt"],
         "reward_snapshot_debt": trove["rewardSnapshotCollateral"],
     }
-    query = upsert_query(
-        Trove, trove_indexes, trove_data, return_columns=[Trove.id]
+
+
+async def _upsert_users(user_ids: set[str]):
+    if not user_ids:
+        return
+    # sorted so that concurrent manager syncs lock users in the same order
+    query = batch_insert_ignore(
+        User, [{"id": user} for user in sorted(user_ids)]
     )
-    return await db.execute(query)
+    await db.execute(query)
 
 
-@celery.task
-async def update_trove_snapshots(
-    chain: str, manager_id: int, from_index: int, to_index: int | None
-):
-    chain_id = CHAINS[chain]
-    to_index, endpoint = get_snapshot_query_setup(chain, from_index, to_index)
-    manager_address = await get_manager_address_by_id_and_chain(
-        chain_id, manager_id
+async def _upsert_troves(
+    manager_id: int, snapshots: list[dict]
+) -> dict[str, int]:
+    # a trove can appear several times in a page, the nested trove entity
+    # always holds its latest state so we only need to write it once
+    troves = {
+        trove["owner_id"]: trove
+        for trove in (
+            _trove_data(manager_id, snapshot["trove"])
+            for snapshot in snapshots
+        )
+    }
+    query = batch_upsert_query(
+        Trove,
+        ["manager_id", "owner_id"],
+        list(troves.values()),
+        return_columns=[Trove.id, Trove.owner_id],
     )
-    if not manager_address:
-        raise Exception(f"Unable to retrieve address of manager {manager_id}")
+    results = await db.fetch_all(query)
+    return {r["owner_id"]: r["id"] for r in results}
+
 
-    for index in range(from_index, to_index, 1000):
-        query = TROVE_SNAPSHOT_QUERY % (manager_address, index)
-        logger.info(
-            f"Updating trove snapshots from index {from_index} to {to_index} for {manager_address} - batch {index}"
+async def _upsert_liquidations(
+    chain_id: int, snapshots: list[dict]
+) -> dict[tuple[str, int], int]:
+    liquidations = {
+        (data["liquidator_id"], int(data["block_timestamp"])): data
+        for data in (
+            _liquidation_data(chain_id, snapshot["liquidation"])
+            for snapshot in snapshots
+            if snapshot["liquidation"]
         )
-        snapshot_data = await async_grt_query(endpoint=endpoint, query=query)
-        if not snapshot_data:
-            raise Exception(
-                f"Did not receive any data from the graph on chain {chain} when query for trove snapshots {query}"
-            )
-        for snapshot in snapshot_data["troveSnapshots"]:
-            trove_id = await _update_trove(manager_id, snapshot["trove"])
+    }
+    if not liquidations:
+        return {}
+    query = batch_upsert_query(
+        Liquidation,
+        ["chain_id", "liquidator_id", "block_timestamp"],
+        list(liquidations.values()),
+        return_columns=[
+            Liquidation.id,
+            Liquidation.liquidator_id,
+            Liquidation.block_timestamp,
+        ],
+    )
+    results = await db.fetch_all(query)
+    return {
+        (r["liquidator_id"], int(r["block_timestamp"])): r["id"]
+        for r in results
+    }
+
+
+async def _upsert_redemptions(
+    chain_id: int, snapshots: list[dict]
+) -> dict[tuple[str, int], int]:
+    redemptions = {
+        (data["redeemer_id"], int(data["block_timestamp"])): data
+        for data in (
+            _redemption_data(chain_id, snapshot["redemption"])
+            for snapshot in snapshots
+            if snapshot["redemption"]
+        )
+    }
+    if not redemptions:
+        return {}
+    query = batch_upsert_query(
+        Redemption,
+        ["chain_id", "redeemer_id", "block_timestamp"],
+        list(redemptions.values()),
+        return_columns=[
+            Redemption.id,
+            Redemption.redeemer_id,
+            Redemption.block_timestamp,
+        ],
+    )
+    results = await db.fetch_all(query)
+    return {
+        (r["redeemer_id"], int(r["block_timestamp"])): r["id"] for r in results
+    }
+
+
+async def _upsert_trove_states(
+    manager_id: int, snapshots: list[dict], trove_ids: dict[str, int]
+):
+    states: dict[int, dict] = {}
+    for snapshot in sorted(
+        snapshots,
+        key=lambda s: (int(s["blockTimestamp"]), int(s["index"])),
+    ):
+        owner_id = snapshot["trove"]["owner"]["id"].lower()
+        trove_id = trove_ids[owner_id]
+        states[trove_id] = {
+            "trove_id": trove_id,
+            "manager_id": manager_id,
+            "owner_id": owner_id,
+            "status": _str_to_trove_status_enum(snapshot["trove"]["status"]),
+            "collateral": snapshot["collateral"],
+            "debt": snapshot["debt"],
+            "stake": snapshot["stake"],
+            "first_timestamp": states[trove_id]["first_timestamp"]
+            if trove_id in states
+            else snapshot["blockTimestamp"],
+            "last_timestamp": snapshot["blockTimestamp"],
+            "last_index": snapshot["index"],
+        }
+
+    insert_stmt = insert(TroveState).values(list(states.values()))
+    excluded = insert_stmt.excluded
+    # pages can be re-ingested after a failed sync, only move the state
+    # forward if the incoming snapshot is not older than the stored one
+    is_newer = tuple_(excluded.last_timestamp, excluded.last_index) >= tuple_(
+        TroveState.last_timestamp, TroveState.last_index
+    )
+    update_columns = {
+        "status": excluded.status,
+        "first_timestamp": func.least(
+            TroveState.first_timestamp, excluded.first_timestamp
+        ),
+    }
+    for column in [
+        "collateral",
+        "debt",
+        "stake",
+        "last_timestamp",
+        "last_index",
+    ]:
+        update_columns[column] = case(
+            [(is_newer, excluded[column])],
+            else_=getattr(TroveState, column),
+        )
+    query = insert_stmt.on_conflict_do_update(
+        index_elements=["trove_id"], set_=update_columns
+    )
+    await db.execute(query)
+
+
+def _event_key(event: dict | None, actor: str) -> tuple[str, int] | None:
+    if not event:
+        return None
+    return event[actor]["id"].lower(), int(event["blockTimestamp"])
+
+
+async def _ingest_snapshots(
+    chain_id: int, manager_id: int, snapshots: list[dict]
+):
+    """
+    Writes a page of trove snapshots with one multi-row statement per table
+    instead of several round trips per snapshot.
+    """
+    if not snapshots:
+        return
+
+    user_ids: set[str] = set()
+    for snapshot in snapshots:
+        user_ids.add(snapshot["trove"]["owner"]["id"].lower())
+        if snapshot["liquidation"]:
+            user_ids.add(snapshot["liquidation"]["liquidator"]["id"].lower())
+        if snapshot["redemption"]:
+            user_ids.add(snapshot["redemption"]["redeemer"]["id"].lower())
+
+    async with db.transaction():
+        await _upsert_users(user_ids)
+        trove_ids = await _upsert_troves(manager_id, snapshots)
+        liquidation_ids = await _upsert_liquidations(chain_id, snapshots)
+        redemption_ids = await _upsert_redemptions(chain_id, snapshots)
 
-            indexes = {
-                "trove_id": trove_id,
+        snapshot_rows: dict[int, dict] = {}
+        for snapshot in snapshots:
+            liquidation_key = _event_key(snapshot["liquidation"], "liquidator")
+            redemption_key = _event_key(snapshot["redemption"], "redeemer")
+            snapshot_rows[int(snapshot["index"])] = {
+                "trove_id": trove_ids[
+                    snapshot["trove"]["owner"]["id"].lower()
+                ],
                 "index": snapshot["index"],
                 "block_timestamp": snapshot["blockTimestamp"],
-            }
-
-            liquidation_id = await _update_liquidation(
-                chain_id, snapshot["liquidation"]
-            )
-            redemption_id = await _update_redemption(
-                chain_id, snapshot["redemption"]
-            )
-            data = {
                 "operation": _str_to_trove_operation_enum(
                     snapshot["operation"]
                 ),
@@ -261,31 +381,88 @@ async def update_trove_snapshots(
                 "debt": snapshot["debt"],
                 "stake": snapshot["stake"],
                 "borrowing_fee": snapshot["borrowingFee"],
-                "liquidation_id": liquidation_id,
-                "redemption_id": redemption_id,
+                "liquidation_id": liquidation_ids[liquidation_key]
+                if liquidation_key
+                else None,
+                "redemption_id": redemption_ids[redemption_key]
+                if redemption_key
+                else None,
                 "block_number": snapshot["blockNumber"],
                 "transaction_hash": snapshot["transactionHash"],
             }
-            query = upsert_query(TroveSnapshot, indexes, data)
-            await db.execute(query)
-            # push to fastApi
-            settings = TroveOperationsSettings(
-                chain=chain, manager=manager_address.lower(), pagination=None
-            )
-            ops = TroveOperation(
-                owner=Web3.to_checksum_address(
-                    snapshot["trove"]["owner"]["id"]
-                ),
-                operation=snapshot["operation"],
-                collateral_usd=snapshot["collateralUSD"],
-                debt=snapshot["debt"],
-                timestamp=snapshot["blockTimestamp"],
-                hash=snapshot["transactionHash"],
-            )
-            payload = TroveOperationsPayload(
-                channel=Channels.trove_operations.value,
-                subscription=settings,
-                type=Payload.update,
-                payload=[ops],
+        query = batch_upsert_query(
+            TroveSnapshot,
+            ["trove_id", "index", "block_timestamp"],
+            list(snapshot_rows.values()),
+        )
+        await db.execute(query)
+        await _upsert_trove_states(manager_id, snapshots, trove_ids)
+
+
+async def _publish_operations(
+    chain: str, manager_address: str, snapshots: list[dict]
+):
+    # one message per page, history older than the horizon is not pushed
+    horizon = time.time() - settings.LIVE_UPDATE_HORIZON
+    operations = [
+        TroveOperation(
+            owner=Web3.to_checksum_address(snapshot["trove"]["owner"]["id"]),
+            operation=snapshot["operation"],
+            collateral_usd=snapshot["collateralUSD"],
+            debt=snapshot["debt"],
+            timestamp=snapshot["blockTimestamp"],
+            hash=snapshot["transactionHash"],
+        )
+        for snapshot in snapshots
+        if int(snapshot["blockTimestamp"]) >= horizon
+    ]
+    if not operations:
+        return
+    subscription = TroveOperationsSettings(
+        chain=chain, manager=manager_address.lower(), pagination=None
+    )
+    payload = TroveOperationsPayload(
+        channel=Channels.trove_operations.value,
+        subscription=subscription,
+        type=Payload.update,
+        payload=operations,
+    )
+    await publish_message(TROVE_OPERATIONS_UPDATE, payload.json())
+
+
+@celery.task
+async def update_trove_snapshots(
+    chain: str, manager_id: int, from_index: int, to_index: int | None
+):
+    chain_id = CHAINS[chain]
+    to_index, endpoint = get_snapshot_query_setup(chain, from_index, to_index)
+    manager_address = await get_manager_address_by_id_and_chain(
+        chain_id, manager_id
+    )
+    if not manager_address:
+        raise Exception(f"Unable to retrieve address of manager {manager_id}")
+
+    queries = (
+        TROVE_SNAPSHOT_QUERY % (manager_address, index)
+        for index in range(from_index, to_index, 1000)
+    )
+    logger.info(
+        f"Updating trove snapshots from index {from_index} to {to_index} for {manager_address}"
+    )
+    async with prefetch_pages(endpoint, queries) as pages:
+        async for query, snapshot_data in pages:
+            if not snapshot_data:
+                raise Exception(
+                    f"Did not receive any data from the graph on chain {chain} when query for trove snapshots {query}"
+                )
+            snapshots = snapshot_data["troveSnapshots"]
+            start = time.perf_counter()
+            await _ingest_snapshots(chain_id, manager_id, snapshots)
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"Ingested {len(snapshots)} trove snapshots for {manager_address} in {elapsed:.2f}s ({len(snapshots) / max(elapsed, 1e-6):.0f} rows/s)"
             )
-            await publish_message(TROVE_OPERATIONS_UPDATE, payload.json())
+
+            # push to fastApi
+            await _publish_operations(chain, manager_address, snapshots)
+    await publish_dataset_changed(Dataset.troves, chain_id)
@@ -1,3 +1,7 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Coroutine
+
 from utils.const import SUBGRAPHS
 
 
@@ -8,3 +12,34 @@ def get_snapshot_query_setup(
         to_index = from_index + 1000
     endpoint = SUBGRAPHS[chain]
     return to_index, endpoint
+
+
+def run_isolated(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """
+    Runs a coroutine in a task with an empty context. `databases` 0.7 keeps
+    the current connection in a context variable that child tasks inherit,
+    so without this concurrent syncs would share one connection and nest
+    their transactions into each other.
+    """
+    # tasks copy the context they are created in
+    return contextvars.Context().run(asyncio.create_task, coro)
+
+
+async def gather_with_concurrency(
+    limit: int, *aws: Awaitable[Any]
+) -> list[Any]:
+    """
+    Like asyncio.gather but runs at most `limit` awaitables at a time.
+    Exceptions are returned in place of results so that one failure does
+    not cancel the other tasks. Each awaitable gets its own database
+    connection.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(aw: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(
+        *(run_isolated(_run(aw)) for aw in aws), return_exceptions=True
+    )
@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+import uuid
+from enum import Enum
+from functools import wraps
+from typing import Any, Awaitable, Callable
+
+import redis
+
+from services.messaging.redis import REDIS_MESSAGING_URL, get_redis_client
+
+logger = logging.getLogger()
+
+LOCK_PREFIX = "task_lock"
+METRICS_PREFIX = "task_metrics"
+# a lease expires this long after its last heartbeat, so a crashed worker
+# only blocks the next runs for a few minutes. Heartbeats are sent from a
+# thread and keep going while a sync blocks its event loop, the margin
+# covers the thread itself being starved of the GIL by a long native call
+LEASE_TTL = 300
+HEARTBEAT_INTERVAL = 30
+
+# extends the lease, and a run requested meanwhile, only if the lease is
+# still held by the caller
+RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    redis.call("expire", KEYS[2], ARGV[2])
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# flags a run for the lock holder, expiring with the lease so a request
+# can't outlive the run it was meant for. Returns 0 if the lock was
+# released in the meantime.
+REQUEST_SCRIPT = """
+local ttl = redis.call("pttl", KEYS[1])
+if ttl <= 0 then
+    return 0
+end
+redis.call("set", KEYS[2], 1, "px", ttl)
+return 1
+"""
+
+UNLOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# a run requested while the lock was held is picked up by the holder
+# before releasing, checked atomically so a request can't slip in between
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if redis.call("del", KEYS[2]) == 1 then
+    redis.call("expire", KEYS[1], ARGV[2])
+    return 2
+end
+redis.call("del", KEYS[1])
+return 1
+"""
+
+RECORD_RUN_SCRIPT = """
+redis.call("hincrby", KEYS[1], "runs", 1)
+redis.call("hincrbyfloat", KEYS[1], "total_runtime", ARGV[1])
+redis.call(
+    "hset", KEYS[1],
+    "last_runtime", ARGV[1],
+    "last_started_at", ARGV[2],
+    "last_finished_at", ARGV[3]
+)
+local max_runtime = tonumber(redis.call("hget", KEYS[1], "max_runtime") or 0)
+if tonumber(ARGV[1]) > max_runtime then
+    redis.call("hset", KEYS[1], "max_runtime", ARGV[1])
+end
+return 1
+"""
+
+# used by heartbeat threads, which can't share the event loop's client
+sync_client: redis.Redis | None = None
+
+
+class LockPolicy(str, Enum):
+    # drop runs fired while a previous one is still going
+    skip = "skip"
+    # run once more after the current run, however many were fired
+    coalesce = "coalesce"
+
+
+def _lock_key(name: str, chain: str) -> str:
+    return f"{LOCK_PREFIX}:{name}:{chain}"
+
+
+def _metrics_key(name: str, chain: str) -> str:
+    return f"{METRICS_PREFIX}:{name}:{chain}"
+
+
+def _get_sync_client() -> redis.Redis:
+    global sync_client
+    if sync_client is None:
+        sync_client = redis.Redis.from_url(
+            REDIS_MESSAGING_URL, decode_responses=True
+        )
+    return sync_client
+
+
+def _heartbeat(key: str, token: str, stopped: threading.Event):
+    client = _get_sync_client()
+    while not stopped.wait(HEARTBEAT_INTERVAL):
+        try:
+            renewed = client.eval(
+                RENEW_SCRIPT, 2, key, f"{key}:pending", token, LEASE_TTL
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Could not renew task lease {key}: {e}")
+            continue
+        if not renewed:
+            logger.warning(f"Lost task lease {key}")
+            return
+
+
+async def _record_run(name: str, chain: str, started_at: float):
+    redis_client = await get_redis_client("celery")
+    finished_at = time.time()
+    await redis_client.eval(
+        RECORD_RUN_SCRIPT,
+        1,
+        _metrics_key(name, chain),
+        finished_at - started_at,
+        started_at,
+        finished_at,
+    )
+
+
+async def _record_overlap(name: str, chain: str, policy: LockPolicy):
+    redis_client = await get_redis_client("celery")
+    field = "skipped" if policy == LockPolicy.skip else "coalesced"
+    await redis_client.hincrby(_metrics_key(name, chain), field, 1)
+
+
+async def _acquire(key: str, token: str, policy: LockPolicy) -> bool:
+    redis_client = await get_redis_client("celery")
+    while not await redis_client.set(key, token, nx=True, ex=LEASE_TTL):
+        if policy == LockPolicy.skip:
+            return False
+        # the holder may have released before seeing the request, in which
+        # case the lock is free to take again
+        if await redis_client.eval(REQUEST_SCRIPT, 2, key, f"{key}:pending"):
+            return False
+    return True
+
+
+def task_lock(policy: LockPolicy = LockPolicy.skip):
+    """
+    Lets a single run of a sync coroutine per chain go at a time across all
+    workers. The chain is the coroutine's first argument. Runs fired
+    while the lock is held are dropped or folded into one extra run
+    depending on `policy`.
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        name = func.__name__
+
+        @wraps(func)
+        async def wrapped(*args, **kwargs):
+            chain = args[0] if args else kwargs["chain"]
+            key = _lock_key(name, chain)
+            token = uuid.uuid4().hex
+            if not await _acquire(key, token, policy):
+                logger.info(
+                    f"{name} already running for {chain} ({policy.value})"
+                )
+                await _record_overlap(name, chain, policy)
+                return None
+
+            redis_client = await get_redis_client("celery")
+            stopped = threading.Event()
+            threading.Thread(
+                target=_heartbeat,
+                args=(key, token, stopped),
+                name=f"heartbeat-{key}",
+                daemon=True,
+            ).start()
+            try:
+                while True:
+                    started_at = time.time()
+                    res = await func(*args, **kwargs)
+                    await _record_run(name, chain, started_at)
+                    released = await redis_client.eval(
+                        RELEASE_SCRIPT,
+                        2,
+                        key,
+                        f"{key}:pending",
+                        token,
+                        LEASE_TTL,
+                    )
+                    if released != 2:
+                        return res
+                    logger.info(f"Running coalesced {name} for {chain}")
+            except Exception:
+                await redis_client.eval(UNLOCK_SCRIPT, 1, key, token)
+                raise
+            finally:
+                stopped.set()
+
+        return wrapped
+
+    return decorator
+
+
+async def get_task_metrics() -> list[dict[str, Any]]:
+    redis_client = await get_redis_client("fastapi")
+    metrics = []
+    async for key in redis_client.scan_iter(
+        match=f"{METRICS_PREFIX}:*", count=100
+    ):
+        _, name, chain = key.split(":")
+        values = await redis_client.hgetall(key)
+        metrics.append(
+            {
+                "task": name,
+                "chain": chain,
+                "running": bool(
+                    await redis_client.exists(_lock_key(name, chain))
+                ),
+                **values,
+            }
+        )
+    return sorted(metrics, key=lambda m: (m["task"], m["chain"]))
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Literal
 
 import dotenv
 from pydantic import BaseSettings
@@ -31,6 +32,19 @@ class Settings(BaseSettings):
     CELERY_RESULT_BACKEND: str | None
     CACHE_REDIS_URL: str | None
 
+    # max number of managers / collaterals synced concurrently per chain
+    SYNC_CONCURRENCY: int = 4
+    # operations older than this (in seconds) are not pushed to live
+    # channels, so back-fills don't flood subscribers with history
+    LIVE_UPDATE_HORIZON: int = 60 * 60
+    # "pubsub" or "streams", streams let API workers catch up on messages
+    # published while they were disconnected
+    REDIS_MESSAGING_BACKEND: Literal["pubsub", "streams"] = "pubsub"
+    # DEX aggregator endpoints, overridable to point at local stubs
+    COWSWAP_API_URL: str = "https://api.cow.fi/mainnet/api/v1"
+    ONEINCH_API_URL: str = "https://api-defillama.1inch.io/v5.2/1"
+    PARASWAP_API_URL: str = "https://apiv5.paraswap.io"
+
     def pg_conn_str(self):
         return f"postgresql://{self.PG_USER}:{self.PG_PASSWORD}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DATABASE}"
 
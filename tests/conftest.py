@@ -0,0 +1,14 @@
+import os
+
+# settings are loaded at import time and require these to be set
+for var in [
+    "PG_HOST",
+    "PG_PORT",
+    "PG_USER",
+    "PG_PASSWORD",
+    "PG_DATABASE",
+    "REDIS_PASSWORD",
+    "ALCHEMY_SUBGRAPH_KEY",
+    "SUBGRAPH_API_KEY",
+]:
+    os.environ.setdefault(var, "5432" if var == "PG_PORT" else "test")
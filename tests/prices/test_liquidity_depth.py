@@ -0,0 +1,14 @@
+import pytest
+
+liquidity_depth = pytest.importorskip("services.prices.liquidity_depth")
+
+
+@pytest.mark.parametrize("max_amount", [10**24, 10**18])
+def test_depth_levels_span_pool_balance(max_amount):
+    levels = liquidity_depth._depth_levels(max_amount)
+
+    assert len(levels) == liquidity_depth.DEPTH_LEVELS
+    assert all(isinstance(level, int) for level in levels)
+    assert all(a < b for a, b in zip(levels, levels[1:]))
+    assert levels[0] == 10**18
+    assert levels[-1] == pytest.approx(max(max_amount, 2 * 10**18))
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+
+from services.sync.utils import gather_with_concurrency
+
+databases = pytest.importorskip("databases")
+pytest.importorskip("aiosqlite")
+
+metadata = sa.MetaData()
+snapshots = sa.Table(
+    "snapshots",
+    metadata,
+    sa.Column("manager_id", sa.Integer),
+    sa.Column("index", sa.Integer),
+)
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'sync.db'}"
+    engine = sa.create_engine(url)
+    metadata.create_all(engine)
+    engine.dispose()
+    database = databases.Database(url)
+    await database.connect()
+    yield database
+    await database.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_failed_manager_sync_keeps_other_rows(db):
+    async def sync_manager(manager_id: int, fail: bool):
+        async with db.transaction():
+            for index in range(3):
+                await db.execute(
+                    snapshots.insert().values(
+                        manager_id=manager_id, index=index
+                    )
+                )
+                # interleave both syncs
+                await asyncio.sleep(0.01)
+            if fail:
+                raise Exception(f"Sync failed for manager {manager_id}")
+
+    # like the syncs, read from the database before fanning out so the
+    # parent task already holds a connection
+    assert (
+        await db.fetch_val(sa.select([sa.func.count()]).select_from(snapshots))
+        == 0
+    )
+    results = await gather_with_concurrency(
+        2, sync_manager(1, fail=True), sync_manager(2, fail=False)
+    )
+
+    assert isinstance(results[0], Exception)
+    assert results[1] is None
+    rows = await db.fetch_all(snapshots.select())
+    assert sorted((r["manager_id"], r["index"]) for r in rows) == [
+        (2, 0),
+        (2, 1),
+        (2, 2),
+    ]
@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import pickle
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable
+
+import aioredis
+
+from services.messaging.redis import REDIS_MESSAGING_URL
+from settings.config import settings
+from utils.const import CHAINS
+
+logger = logging.getLogger()
+
+CACHE_PREFIX = "cache"
+# how long past its ttl an entry is still served while being recomputed
+DEFAULT_STALE_TTL = 600
+# lease held by the worker computing a cold key
+COMPUTE_LOCK_TTL = 30
+# how long other workers wait on that lease before computing themselves
+COMPUTE_WAIT_TIMEOUT = 10
+COMPUTE_POLL_INTERVAL = 0.05
+# number of recently requested entries per namespace recomputed on warm-up
+WARM_KEYS_PER_NAMESPACE = 64
+# scope of entries whose arguments do not identify a chain
+ANY_CHAIN = "any"
+
+cache_client: aioredis.Redis | None = None
+# calls in flight in this process, keyed by cache key
+inflight: dict[str, asyncio.Future] = {}
+refreshing: set[str] = set()
+# background refreshes, referenced until done so they aren't collected
+refresh_tasks: set[asyncio.Task] = set()
+# recently requested calls per namespace, used to pre-warm after eviction
+recent_calls: dict[str, OrderedDict[str, tuple[Callable, int, int]]] = {}
+
+
+async def get_cache_client() -> aioredis.Redis:
+    global cache_client
+    if cache_client is None:
+        cache_client = aioredis.from_url(
+            settings.CACHE_REDIS_URL or REDIS_MESSAGING_URL,
+            decode_responses=False,
+        )
+    return cache_client
+
+
+async def close_cache():
+    global cache_client
+    if cache_client is not None:
+        await cache_client.close()
+        cache_client = None
+
+
+def _namespace_prefix(namespace: str, scope: str | None = None) -> str:
+    if scope is None:
+        return f"{CACHE_PREFIX}:{namespace}:"
+    return f"{CACHE_PREFIX}:{namespace}:{scope}:"
+
+
+def _chain_scope(signature: inspect.Signature, args, kwargs) -> str:
+    """
+    Scopes an entry to the chain given by its `chain_id` or `chain`
+    argument so that a change on one chain leaves the others cached.
+    """
+    try:
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return ANY_CHAIN
+    if arguments.get("chain_id") is not None:
+        return str(arguments["chain_id"])
+    if arguments.get("chain") in CHAINS:
+        return str(CHAINS[arguments["chain"]])
+    return ANY_CHAIN
+
+
+def _make_key(namespace: str, scope: str, func: Callable, args, kwargs) -> str:
+    signature = repr((args, sorted(kwargs.items())))
+    digest = hashlib.sha1(signature.encode()).hexdigest()
+    return f"{_namespace_prefix(namespace, scope)}{func.__qualname__}:{digest}"
+
+
+async def _read(key: str) -> tuple[float, Any] | None:
+    try:
+        client = await get_cache_client()
+        raw = await client.get(key)
+    except aioredis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return None
+    if raw is None:
+        return None
+    return pickle.loads(raw)
+
+
+async def _write(key: str, value: Any, ttl: int, stale_ttl: int):
+    try:
+        client = await get_cache_client()
+        await client.set(
+            key,
+            pickle.dumps((time.time() + ttl, value)),
+            ex=ttl + stale_ttl,
+        )
+    except aioredis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
+
+async def _acquire_lock(key: str) -> bool:
+    try:
+        client = await get_cache_client()
+        return bool(
+            await client.set(f"{key}:lock", b"1", nx=True, ex=COMPUTE_LOCK_TTL)
+        )
+    except aioredis.RedisError:
+        return True
+
+
+async def _release_lock(key: str):
+    try:
+        client = await get_cache_client()
+        await client.delete(f"{key}:lock")
+    except aioredis.RedisError:
+        pass
+
+
+async def _compute(
+    key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int
+) -> Any:
+    """
+    Computes a missing or expired entry once across all workers: the
+    worker holding the lease computes and stores the value, the others
+    poll until it lands or the wait times out.
+    """
+    if not await _acquire_lock(key):
+        deadline = time.monotonic() + COMPUTE_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(COMPUTE_POLL_INTERVAL)
+            entry = await _read(key)
+            if entry is not None and entry[0] > time.time():
+                return entry[1]
+    try:
+        value = await compute()
+        await _write(key, value, ttl, stale_ttl)
+        return value
+    finally:
+        await _release_lock(key)
+
+
+async def _coalesced(
+    key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int
+) -> Any:
+    # concurrent callers in this process share a single computation
+    future = inflight.get(key)
+    if future is not None:
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # the leading caller was cancelled rather than this one, so
+            # compute again instead of failing every waiter
+            if not future.cancelled():
+                raise
+            return await _coalesced(key, compute, ttl, stale_ttl)
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    try:
+        value = await _compute(key, compute, ttl, stale_ttl)
+        future.set_result(value)
+        return value
+    except Exception as e:
+        future.set_exception(e)
+        # mark retrieved so that callers-less failures are not logged twice
+        future.exception()
+        raise
+    finally:
+        # cancelled before a result, waiters must not hang on the future
+        if not future.done():
+            future.cancel()
+        if inflight.get(key) is future:
+            del inflight[key]
+
+
+def _remember_call(
+    namespace: str,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int,
+    stale_ttl: int,
+):
+    calls = recent_calls.setdefault(namespace, OrderedDict())
+    calls[key] = (compute, ttl, stale_ttl)
+    calls.move_to_end(key)
+    if len(calls) > WARM_KEYS_PER_NAMESPACE:
+        calls.popitem(last=False)
+
+
+async def _refresh(
+    key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int
+):
+    try:
+        await _coalesced(key, compute, ttl, stale_ttl)
+    except Exception as e:
+        logger.error(f"Background cache refresh failed for {key}: {e}")
+    finally:
+        refreshing.discard(key)
+
+
+def shared_cached(
+    ttl: int, namespace: str, stale_ttl: int = DEFAULT_STALE_TTL
+):
+    """
+    Caches the result of a coroutine in Redis so that all API workers
+    share one copy. Entries past their ttl are still served for
+    `stale_ttl` seconds while a single background task recomputes them.
+    `namespace` groups entries so they can be dropped with `invalidate`,
+    per chain when the coroutine takes a `chain_id` or `chain` argument.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapped(*args, **kwargs):
+            scope = _chain_scope(signature, args, kwargs)
+            key = _make_key(namespace, scope, func, args, kwargs)
+
+            async def compute():
+                return await func(*args, **kwargs)
+
+            _remember_call(namespace, key, compute, ttl, stale_ttl)
+            entry = await _read(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at <= time.time() and key not in refreshing:
+                    refreshing.add(key)
+                    task = asyncio.create_task(
+                        _refresh(key, compute, ttl, stale_ttl)
+                    )
+                    refresh_tasks.add(task)
+                    task.add_done_callback(refresh_tasks.discard)
+                return value
+            return await _coalesced(key, compute, ttl, stale_ttl)
+
+        wrapped.namespace = namespace
+        return wrapped
+
+    return decorator
+
+
+def _scope_prefixes(namespace: str, chain_id: int | None) -> list[str]:
+    if chain_id is None:
+        return [_namespace_prefix(namespace)]
+    # entries that can't be tied to a chain may depend on any of them
+    return [
+        _namespace_prefix(namespace, str(chain_id)),
+        _namespace_prefix(namespace, ANY_CHAIN),
+    ]
+
+
+async def invalidate(namespace: str, chain_id: int | None = None) -> int:
+    """
+    Drops the cached entries of a namespace for a chain, or for all chains
+    when `chain_id` is not given. Returns the number of keys removed.
+    """
+    removed = 0
+    try:
+        client = await get_cache_client()
+        keys = [
+            key
+            for prefix in _scope_prefixes(namespace, chain_id)
+            async for key in client.scan_iter(match=f"{prefix}*", count=500)
+        ]
+        if keys:
+            removed = await client.unlink(*keys)
+    except aioredis.RedisError as e:
+        logger.warning(f"Cache invalidation failed for {namespace}: {e}")
+    return removed
+
+
+async def warm(namespace: str, chain_id: int | None = None):
+    """
+    Recomputes the entries of a namespace that were recently requested
+    from this process, limited to a chain when `chain_id` is given.
+    """
+    prefixes = tuple(_scope_prefixes(namespace, chain_id))
+    calls = [
+        (key, call)
+        for key, call in recent_calls.get(namespace, {}).items()
+        if key.startswith(prefixes)
+    ]
+    for key, (compute, ttl, stale_ttl) in calls:
+        try:
+            # the entry was just evicted so this goes through the lease
+            # and stores the fresh value for every worker
+            await _coalesced(key, compute, ttl, stale_ttl)
+        except Exception as e:
+            logger.error(f"Cache warm-up failed for {key}: {e}")
@@ -1,19 +1,20 @@
-import asyncio
 import logging
 
 from sqlalchemy import select
 from web3 import Web3
 
-from database.engine import db, wrap_dbs
+from database.engine import db, run_in_worker
 from database.models.common import User
 from database.utils import upsert_user
 from services.celery import celery
+from services.task_lock import task_lock
 from utils.const import PROVIDERS
 from utils.labels.manual import MANUAL_LABELS
 
 logger = logging.getLogger()
 
 
+@task_lock()
 async def label_users(chain: str):
     logger.info("Syncing labels for users")
     provider = Web3(PROVIDERS[chain])
@@ -30,4 +31,4 @@ async def label_users(chain: str):
 
 @celery.task
 def update_labels(chain: str):
-    asyncio.run(wrap_dbs(label_users)(chain))
+    run_in_worker(label_users, chain)
@@ -0,0 +1,66 @@
+"""
+Solvers for trade sizes that move a pool's price by a given amount.
+"""
+from typing import Callable
+
+
+def max_amount_within_impact(
+    get_dy: Callable[[int], int],
+    impact: float,
+    max_amount: int,
+    reference_amount: int = 10**18,
+    bracket: tuple[int, int] | None = None,
+    rtol: float = 1e-5,
+) -> int:
+    """
+    Find the largest input amount whose average execution price is within
+    `impact` of the price for `reference_amount`, by bisection on the pool's
+    exact `get_dy`.
+
+    Parameters
+    ----------
+    get_dy: callable
+        amount received for a given input amount, e.g. a partial of
+        `CurvePool.get_dy` or `CurveMetaPool.get_dy_underlying`
+    impact: float
+        price move, 0.02 for 2%
+    max_amount: int
+        largest amount considered
+    reference_amount: int, optional
+        amount whose price is used as the reference (default = 1 token)
+    bracket: tuple of int, optional
+        amounts known to be below and above the threshold, narrows the
+        search when a price curve was already computed
+    rtol: float, optional
+        relative precision of the returned amount
+
+    Returns
+    -------
+    int
+        The threshold amount, `max_amount` if the price never moves that
+        much within range.
+    """
+    reference_rate = get_dy(reference_amount) / reference_amount
+    min_rate = reference_rate / (1 + impact)
+
+    def within(amount: int) -> bool:
+        try:
+            return get_dy(amount) / amount >= min_rate
+        except (AssertionError, ZeroDivisionError, ValueError):
+            # the pool can't fill trades this large
+            return False
+
+    if bracket is None:
+        if within(max_amount):
+            return max_amount
+        low, high = reference_amount, max_amount
+    else:
+        low, high = bracket
+
+    while high - low > max(1, int(low * rtol)):
+        middle = (low + high) // 2
+        if within(middle):
+            low = middle
+        else:
+            high = middle
+    return low
@@ -506,6 +506,94 @@ class CurveMetaPool(CurvePool):  # pylint: disable=too-many-instance-attributes
 
         return dy
 
+    # pylint: disable-next=too-many-locals
+    def get_dy_underlying_batch(self, i, j, dxs):
+        """
+        Vectorized `get_dy_underlying` over several input amounts.
+
+        Rates, balances and the invariants of both pools are computed once
+        for the whole sweep, and each `y` solve is warm-started from the
+        solution of the next smaller amount. Results are identical to
+        calling `get_dy_underlying` for each amount.
+
+        Parameters
+        ----------
+        i: int
+            index of the "in" coin, base pool coins come after the
+            metapool's own coins
+        j: int
+            index of the "out" coin
+        dxs: list of int
+            amounts of coin `i` being exchanged
+
+        Returns
+        -------
+        list of int
+            amount of coin `j` received for each input amount, in the
+            order of `dxs`
+
+        Note
+        ----
+        This is a "view" function; it doesn't change the state of the pool.
+        """
+        base_i = i - self.max_coin
+        base_j = j - self.max_coin
+        if base_i >= 0 and base_j >= 0:
+            # If both are from the base pool
+            return self.basepool.get_dy_batch(base_i, base_j, dxs)
+
+        meta_i = i if base_i < 0 else self.max_coin
+        meta_j = j if base_j < 0 else self.max_coin
+        rates = self.rates
+        xp = [x * p // 10**18 for x, p in zip(self.balances, rates)]
+        D = mpz(self.D(xp))
+        n = self.n
+        Ann = self.A * n
+
+        if base_i >= 0:
+            basepool = self.basepool
+            base_D0 = basepool.get_D_mem(basepool.balances, basepool.A)
+
+        results = [0] * len(dxs)
+        y = D
+        for index in sorted(range(len(dxs)), key=lambda k: dxs[k]):
+            dx = dxs[index]
+            if base_i < 0:
+                x = xp[i] + dx * rates[i] // 10**18
+            else:
+                # amount of base pool tokens minted for the deposit, as in
+                # `calc_token_amount` without fees
+                base_balances = basepool.balances[:]
+                base_balances[base_i] += dx
+                base_D1 = basepool.get_D_mem(base_balances, basepool.A)
+                minted = basepool.tokens * (base_D1 - base_D0) // base_D0
+                x = minted * rates[self.max_coin] // 10**18
+                x += xp[self.max_coin]
+
+            xx = xp[:]
+            xx[meta_i] = x
+            xx = [xx[k] for k in range(n) if k != meta_j]
+            c = D
+            for other in xx:
+                c = c * D // (other * n)
+            c = c * D // (n * Ann)
+            b = sum(xx) + D // Ann - D
+            y_prev = 0
+            while abs(y - y_prev) > 1:
+                y_prev = y
+                y = (y**2 + c) // (2 * y + b)
+
+            dy = xp[meta_j] - int(y) - 1
+            dy_fee = dy * self.fee // 10**10
+            dy = (dy - dy_fee) * 10**18 // rates[meta_j]
+
+            # Withdraw from the base pool if needed
+            if base_j >= 0:
+                dy, _ = self.basepool.calc_withdraw_one_coin(dy, base_j)
+            results[index] = dy
+
+        return results
+
     # pylint: disable-next=too-many-locals
     def calc_withdraw_one_coin(self, token_amount, i, use_fee=True):
         """
@@ -312,6 +312,79 @@ class CurvePool:  # pylint: disable=too-many-instance-attributes
 
         return dy
 
+    def get_dy_batch(self, i, j, dxs):
+        """
+        Vectorized `get_dy` over several input amounts.
+
+        `D` and the coin balances are computed once for the whole sweep and
+        each `y` solve is warm-started from the solution of the next
+        smaller amount. Newton's method converges to the same integer
+        fixed point from any start above the root, so results are
+        identical to calling `get_dy` for each amount.
+
+        Parameters
+        ----------
+        i: int
+            index of the "in" coin
+        j: int
+            index of the "out" coin
+        dxs: list of int
+            amounts of coin `i` being exchanged
+
+        Returns
+        -------
+        list of int
+            amount of coin `j` received for each input amount, in the
+            order of `dxs`
+
+        Note
+        ----
+        This is a "view" function; it doesn't change the state of the pool.
+        """
+        n = self.n
+        xp = self._xp()
+        D = mpz(self.D(xp))
+        Ann = self.A * n
+        rate_i = self.rates[i]
+        rate_j = self.rates[j]
+        others = [k for k in range(n) if k not in (i, j)]
+        # keep the scalar path's folding order so rounding is identical
+        before = [xp[k] for k in others if k < i]
+        after = [xp[k] for k in others if k > i]
+        c_before = D
+        for y in before:
+            c_before = c_before * D // (y * n)
+        sum_others = sum(before) + sum(after)
+
+        results = [0] * len(dxs)
+        y = D
+        for index in sorted(range(len(dxs)), key=lambda k: dxs[k]):
+            x = xp[i] + dxs[index] * rate_i // 10**18
+            c = c_before * D // (x * n)
+            for other in after:
+                c = c * D // (other * n)
+            c = c * D // (n * Ann)
+            b = sum_others + x + D // Ann - D
+            y_prev = 0
+            while abs(y - y_prev) > 1:
+                y_prev = y
+                y = (y**2 + c) // (2 * y + b)
+            dy = xp[j] - int(y) - 1
+
+            if self.fee_mul is None:
+                fee = dy * self.fee // 10**10
+            else:
+                fee = (
+                    dy
+                    * self.dynamic_fee((xp[i] + x) // 2, (xp[j] + int(y)) // 2)
+                    // 10**10
+                )
+            dy = (dy - fee) * 10**18 // rate_j
+            assert dy >= 0
+            results[index] = dy
+
+        return results
+
     def exchange(self, i, j, dx):
         """
         Perform an exchange between two coins.
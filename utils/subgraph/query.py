@@ -1,11 +1,23 @@
+import asyncio
 import logging
+import random
 import time
-from typing import Any, List, Mapping, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+)
 
 import aiohttp
 import requests
 import requests.exceptions
 
+from utils.http import get_http_session
+
 logger = logging.getLogger()
 
 
@@ -29,29 +41,223 @@ def grt_query(
     return None
 
 
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class SubgraphRequestError(Exception):
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops hammering an endpoint that keeps failing: after `threshold`
+    consecutive failures, requests are rejected for `cooldown` seconds,
+    after which requests are let through again and the first failure
+    re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 120):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    def check(self, endpoint: str):
+        if self.opened_at is None:
+            return
+        if time.monotonic() - self.opened_at < self.cooldown:
+            raise CircuitOpenError(
+                f"Circuit open for {endpoint} after {self.failures} failures"
+            )
+        # half open: let requests through, the next failure re-opens
+        self.opened_at = None
+        self.failures = self.threshold - 1
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+circuit_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    if endpoint not in circuit_breakers:
+        circuit_breakers[endpoint] = CircuitBreaker()
+    return circuit_breakers[endpoint]
+
+
+def backoff_delay(
+    attempt: int, base_delay: float = 2, max_delay: float = 60
+) -> float:
+    # exponential backoff with full jitter
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
 async def fetch_data(endpoint: str, query: str):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            endpoint, json={"query": query}, timeout=600
-        ) as response:
-            if response.status != 200:
-                raise Exception(
-                    f"Request failed with status {response.status}"
-                )
-            return await response.json()
+    session = await get_http_session()
+    async with session.post(
+        endpoint, json={"query": query}, timeout=600
+    ) as response:
+        if response.status != 200:
+            raise SubgraphRequestError(
+                f"Request failed with status {response.status}",
+                retryable=response.status in RETRYABLE_STATUSES,
+            )
+        return await response.json()
 
 
 async def async_grt_query(
-    endpoint: str, query: str
+    endpoint: str, query: str, retries: int = 4
 ) -> dict[str, list[dict[str, Any]]] | None:
-    for i in range(3):
-        r = await fetch_data(endpoint, query)
+    breaker = get_circuit_breaker(endpoint)
+    for i in range(retries):
+        breaker.check(endpoint)
         try:
+            r = await fetch_data(endpoint, query)
+        except SubgraphRequestError as e:
+            if not e.retryable:
+                raise
+            error: Exception = e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+        else:
+            breaker.record_success()
             return r.get("data", None)
-        except Exception as e:
-            logger.error(
-                f"Failed at fulfilling request {query} for {endpoint}: {e}, retrying ({i}/3)"
-            )
-            time.sleep(60)
-            continue
+
+        breaker.record_failure()
+        if i == retries - 1:
+            break
+        delay = backoff_delay(i)
+        logger.error(
+            f"Failed at fulfilling request {query} for {endpoint}: {error!r}, retrying in {delay:.1f}s ({i + 1}/{retries})"
+        )
+        await asyncio.sleep(delay)
     return None
+
+
+async def fetch_pages(
+    endpoint: str, queries: Iterable[str]
+) -> AsyncIterator[tuple[str, dict[str, list[dict[str, Any]]] | None]]:
+    for query in queries:
+        yield query, await async_grt_query(endpoint=endpoint, query=query)
+
+
+async def keyset_pages(
+    endpoint: str,
+    build_query: Callable[[Any], str],
+    entity: str,
+    cursor_field: str,
+    start: Any,
+    page_size: int = 1000,
+) -> AsyncIterator[tuple[str, dict[str, list[dict[str, Any]]] | None]]:
+    """
+    Pages through `entity` using a `<cursor_field>_gt` filter instead of
+    `skip`, which gets slower as offsets grow and is capped by the indexer.
+    `build_query` receives the current cursor value and must return a query
+    ordered ascending on `cursor_field` and filtered with `_gt` on it.
+    Stops at the first empty or partial page, or when no data is returned
+    (in which case the empty result is yielded for the caller to handle).
+    """
+    cursor = start
+    while True:
+        query = build_query(cursor)
+        data = await async_grt_query(endpoint=endpoint, query=query)
+        yield query, data
+        if not data:
+            return
+        records = data[entity]
+        if len(records) < page_size:
+            return
+        cursor = records[-1][cursor_field]
+
+
+class PagePrefetcher:
+    """
+    Drives a page source in a background task so that the next pages are
+    fetched while the consumer is still writing the current one.
+    At most `depth` pages are buffered ahead of the consumer, the producer
+    waits for room in the buffer before requesting anything further.
+
+    Usage:
+        async with prefetch_pages(endpoint, queries) as pages:
+            async for query, data in pages:
+                ...
+    """
+
+    _DONE = object()
+
+    def __init__(self, pages: AsyncIterator, depth: int = 1):
+        if depth < 1:
+            raise ValueError("Prefetch depth must be at least 1")
+        self._pages = pages
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+        self._task: asyncio.Task | None = None
+
+    async def _produce(self):
+        try:
+            async for page in self._pages:
+                await self._queue.put(page)
+        except Exception as e:
+            await self._queue.put(e)
+            return
+        await self._queue.put(self._DONE)
+
+    async def __aenter__(self) -> "PagePrefetcher":
+        self._task = asyncio.create_task(self._produce())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        aclose = getattr(self._pages, "aclose", None)
+        if aclose:
+            await aclose()
+
+    def __aiter__(self) -> "PagePrefetcher":
+        return self
+
+    async def __anext__(self):
+        if not self._task:
+            raise RuntimeError("PagePrefetcher must be used as a context")
+        page = await self._queue.get()
+        if page is self._DONE:
+            raise StopAsyncIteration
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+
+def prefetch_pages(
+    endpoint: str, queries: Iterable[str], depth: int = 1
+) -> PagePrefetcher:
+    return PagePrefetcher(fetch_pages(endpoint, queries), depth=depth)
+
+
+def prefetch_keyset_pages(
+    endpoint: str,
+    build_query: Callable[[Any], str],
+    entity: str,
+    cursor_field: str,
+    start: Any,
+    depth: int = 1,
+) -> PagePrefetcher:
+    return PagePrefetcher(
+        keyset_pages(endpoint, build_query, entity, cursor_field, start),
+        depth=depth,
+    )